@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Pooled HTTP client shared by the API scripts.
+
+One requests.Session per host keeps TLS connections alive between calls,
+with a connection pool sized for the number of worker threads, gzip
+negotiation, a urllib3 Retry policy for transport errors and a default
+timeout on every request.
+"""
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# --------- Config ----------
+DEFAULT_TIMEOUT = 30       # seconds, used when the caller gives none
+POOL_SIZE = 16             # connections kept per host
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.5        # urllib3 backoff_factor
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# ---------------------------
+
+_sessions = {}
+_lock = threading.Lock()
+
+
+def make_retry(retry_statuses: bool = True) -> Retry:
+    """
+    urllib3 retry policy: connection/read errors are always retried;
+    retry_statuses adds RETRY_STATUSES (honoring Retry-After). Callers
+    that do their own status handling (api_scheduler) turn it off so
+    every attempt goes through them.
+    """
+    return Retry(
+        total=RETRY_TOTAL,
+        connect=RETRY_TOTAL,
+        read=RETRY_TOTAL,
+        status=RETRY_TOTAL if retry_statuses else 0,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=RETRY_STATUSES if retry_statuses else (),
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+def configure(pool_size: int | None = None):
+    """
+    Set the per-host pool size. Only affects sessions created afterwards,
+    so call it before the first request (e.g. from main()).
+    """
+    global POOL_SIZE
+    if pool_size is not None:
+        POOL_SIZE = max(1, pool_size)
+
+
+def get_session(url: str, retry_statuses: bool = True) -> requests.Session:
+    """
+    The shared session for url's scheme and host (created on first use).
+    """
+    parsed = urlparse(url)
+    key = (parsed.scheme, parsed.netloc, retry_statuses)
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=POOL_SIZE,
+                max_retries=make_retry(retry_statuses),
+            )
+            session.mount(f"{parsed.scheme}://{parsed.netloc}", adapter)
+            session.headers["Accept-Encoding"] = "gzip, deflate"
+            _sessions[key] = session
+    return session
+
+
+def get(url: str, params=None, timeout: float = DEFAULT_TIMEOUT,
+        retry_statuses: bool = True, **kwargs) -> requests.Response:
+    """
+    requests.get() over the pooled session for url's host.
+    """
+    session = get_session(url, retry_statuses=retry_statuses)
+    return session.get(url, params=params, timeout=timeout, **kwargs)
+
+
+def close_all():
+    """
+    Close every pooled session (they are recreated on next use).
+    """
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Per-request instrumentation for the API scripts.
+
+RequestScheduler records every HTTP attempt here (wall time, status,
+bytes received, retries) and callers route JSON decoding through it, so
+after a run the time spent waiting on the API, retrying, decoding and
+writing to disk can be told apart. Results are written as a JSON summary
+and as a Prometheus text-format file (node_exporter textfile collector
+style) with latency histograms and per-endpoint totals.
+"""
+import os
+import json
+import time
+import threading
+from array import array
+from contextlib import contextmanager
+
+# --------- Config ----------
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)   # seconds
+DECODE_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5)  # seconds
+METRIC_PREFIX = "youtube_api"
+# ---------------------------
+
+
+def quantile(sorted_values, q: float) -> float | None:
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def describe(samples) -> dict:
+    """
+    count / sum / mean / p50 / p95 / p99 / max of a list of seconds.
+    """
+    values = sorted(samples)
+    total = sum(values)
+    return {
+        "count": len(values),
+        "sum": total,
+        "mean": total / len(values) if values else None,
+        "p50": quantile(values, 0.50),
+        "p95": quantile(values, 0.95),
+        "p99": quantile(values, 0.99),
+        "max": values[-1] if values else None,
+    }
+
+
+class EndpointStats:
+    def __init__(self):
+        self.statuses = {}           # HTTP status -> attempts
+        self.retries = 0
+        self.bytes = 0
+        self.latency = array("d")    # seconds per attempt
+        self.decode = array("d")     # seconds per resp.json()
+
+
+class RequestMetrics:
+    """
+    Thread-safe collector shared by all threads of a run.
+    """
+
+    def __init__(self):
+        self.endpoints = {}
+        self.timers = {}             # stage name -> seconds
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def _stats(self, endpoint: str) -> EndpointStats:
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = self.endpoints[endpoint] = EndpointStats()
+        return stats
+
+    def record(self, endpoint: str, status: int, seconds: float, nbytes: int):
+        """
+        One HTTP attempt (retried attempts are recorded too).
+        """
+        with self._lock:
+            stats = self._stats(endpoint)
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.bytes += nbytes
+            stats.latency.append(seconds)
+
+    def retry(self, endpoint: str):
+        with self._lock:
+            self._stats(endpoint).retries += 1
+
+    def decode(self, endpoint: str, seconds: float):
+        with self._lock:
+            self._stats(endpoint).decode.append(seconds)
+
+    def add_time(self, stage: str, seconds: float):
+        with self._lock:
+            self.timers[stage] = self.timers.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def timed(self, stage: str):
+        """
+        Add the time spent in the with-block to timers[stage]
+        (e.g. "disk_write").
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def summary(self) -> dict:
+        with self._lock:
+            endpoints = {
+                ep: {
+                    "requests": sum(s.statuses.values()),
+                    "statuses": {str(k): v for k, v in sorted(s.statuses.items())},
+                    "retries": s.retries,
+                    "bytes": s.bytes,
+                    "latency_seconds": describe(s.latency),
+                    "json_decode_seconds": describe(s.decode),
+                }
+                for ep, s in sorted(self.endpoints.items())
+            }
+            timers = dict(self.timers)
+        return {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.started)),
+            "wall_seconds": time.time() - self.started,
+            "endpoints": endpoints,
+            "timers_seconds": timers,
+        }
+
+    def summary_line(self) -> str:
+        parts = []
+        for ep, s in self.summary()["endpoints"].items():
+            lat = s["latency_seconds"]
+            if lat["count"]:
+                parts.append(f"{ep}: p50 {lat['p50'] * 1000:.0f} ms, p95 {lat['p95'] * 1000:.0f} ms"
+                             f", {s['retries']} retries")
+        return "Request latency: " + ("; ".join(parts) if parts else "no requests")
+
+    def prometheus(self) -> str:
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        p = METRIC_PREFIX
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f"# HELP {p}_{name} {help_text}")
+            lines.append(f"# TYPE {p}_{name} {kind}")
+
+        def histogram(name, ep, samples, buckets):
+            for le in buckets:
+                n = sum(1 for v in samples if v <= le)
+                lines.append(f'{p}_{name}_bucket{{endpoint="{ep}",le="{le:g}"}} {n}')
+            lines.append(f'{p}_{name}_bucket{{endpoint="{ep}",le="+Inf"}} {len(samples)}')
+            lines.append(f'{p}_{name}_sum{{endpoint="{ep}"}} {sum(samples):.6f}')
+            lines.append(f'{p}_{name}_count{{endpoint="{ep}"}} {len(samples)}')
+
+        with self._lock:
+            items = sorted(self.endpoints.items())
+            header("requests_total", "counter", "HTTP attempts by endpoint and status.")
+            for ep, s in items:
+                for status, n in sorted(s.statuses.items()):
+                    lines.append(f'{p}_requests_total{{endpoint="{ep}",status="{status}"}} {n}')
+            header("retries_total", "counter", "Retried attempts by endpoint.")
+            for ep, s in items:
+                lines.append(f'{p}_retries_total{{endpoint="{ep}"}} {s.retries}')
+            header("response_bytes_total", "counter", "Response body bytes received.")
+            for ep, s in items:
+                lines.append(f'{p}_response_bytes_total{{endpoint="{ep}"}} {s.bytes}')
+            header("request_duration_seconds", "histogram", "Wall time per HTTP attempt.")
+            for ep, s in items:
+                histogram("request_duration_seconds", ep, s.latency, LATENCY_BUCKETS)
+            header("json_decode_seconds", "histogram", "Time spent decoding response JSON.")
+            for ep, s in items:
+                histogram("json_decode_seconds", ep, s.decode, DECODE_BUCKETS)
+            header("stage_seconds_total", "counter", "Time spent per run stage.")
+            for stage, seconds in sorted(self.timers.items()):
+                lines.append(f'{p}_stage_seconds_total{{stage="{stage}"}} {seconds:.6f}')
+        lines.append(f"{p}_run_wall_seconds {time.time() - self.started:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, json_path: str | None = None, prom_path: str | None = None):
+        """
+        Write the JSON summary and/or the Prometheus file. Both are
+        replaced atomically, as textfile collectors expect.
+        """
+        if json_path:
+            _write_atomic(json_path, json.dumps(self.summary(), indent=2) + "\n")
+        if prom_path:
+            _write_atomic(prom_path, self.prometheus())
+
+
+def _write_atomic(path: str, text: str):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+        f.write(text)
+    os.replace(tmp, path)
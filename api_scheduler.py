@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Quota- and rate-aware request scheduling shared by the YouTube scripts.
+
+RequestScheduler.get() is a drop-in for requests.get() (sent over the pooled
+api_client sessions) that
+    - waits on a token bucket so requests never exceed `rate` per second
+      (and optionally caps how many are open at once),
+    - charges each call's quota units to a per-endpoint ledger (and refuses
+      to send once an optional budget would be exceeded),
+    - retries 429s, 5xx errors and 403 rate-limit errors with jittered
+      exponential backoff, honoring Retry-After when the server sends it,
+    - raises QuotaExhausted at once on a 403 quotaExceeded (the daily
+      quota is used up, so retrying can't help),
+    - counts response bytes per endpoint (PayloadCounter),
+    - records wall time, status and size of every attempt (api_metrics).
+The final response is returned as-is, so callers keep their own
+raise_for_status() handling; decoding it with RequestScheduler.json()
+also times the JSON parse.
+"""
+import re
+import random
+import argparse
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import api_client
+from api_metrics import RequestMetrics
+
+# --------- Config ----------
+DEFAULT_RATE = 10.0        # requests per second
+DEFAULT_BURST = 10         # token bucket capacity
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0         # seconds, doubled per attempt
+BACKOFF_CAP = 64.0         # seconds
+
+# YouTube Data API v3 quota cost per call, keyed by the last URL path
+# segment. Anything not listed costs 1 unit.
+QUOTA_COSTS = {
+    "search": 100,
+    "videos": 1,
+    "channels": 1,
+    "commentThreads": 1,
+    "comments": 1,
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_403_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+QUOTA_EXHAUSTED_REASON = "quotaExceeded"
+# ---------------------------
+
+
+class QuotaBudgetExceeded(RuntimeError):
+    """Raised before sending a request that would go over the quota budget."""
+
+
+class QuotaExhausted(RuntimeError):
+    """Raised when the API answers 403 quotaExceeded: the daily quota is used up."""
+
+
+# Either way no further request can succeed, so callers stop scheduling work
+QUOTA_ERRORS = (QuotaBudgetExceeded, QuotaExhausted)
+
+
+def check_rate(rate: float) -> float:
+    """
+    rate if it is a usable requests-per-second limit, else ValueError.
+    """
+    if not rate > 0:
+        raise ValueError(f"rate must be a positive number of requests per second, not {rate!r}")
+    return rate
+
+
+def positive_rate(value: str) -> float:
+    """
+    argparse type for --rate.
+    """
+    try:
+        return check_rate(float(value))
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, at most `capacity`
+    stored. acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE, capacity: int = DEFAULT_BURST):
+        self.rate = check_rate(rate)
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class QuotaLedger:
+    """
+    Per-endpoint quota-unit accounting with an optional overall budget.
+    """
+
+    def __init__(self, budget: int | None = None):
+        self.budget = budget
+        self.units = {}
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    @property
+    def used(self) -> int:
+        return sum(self.units.values())
+
+    def charge(self, endpoint: str):
+        if not self.try_charge(endpoint):
+            raise QuotaBudgetExceeded(
+                f"{endpoint} call would use {QUOTA_COSTS.get(endpoint, 1)} units; "
+                f"{self.used} of the {self.budget}-unit budget already used."
+            )
+
+    def try_charge(self, endpoint: str) -> bool:
+        """
+        Charge one call to endpoint if the budget allows it; False (and
+        nothing charged) otherwise.
+        """
+        cost = QUOTA_COSTS.get(endpoint, 1)
+        with self._lock:
+            if self.budget is not None and self.used + cost > self.budget:
+                return False
+            self.units[endpoint] = self.units.get(endpoint, 0) + cost
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+            return True
+
+    def summary(self) -> str:
+        parts = ", ".join(
+            f"{ep}: {self.calls[ep]} calls / {units} units"
+            for ep, units in sorted(self.units.items())
+        )
+        return f"Quota used: {self.used} units" + (f" ({parts})" if parts else "")
+
+
+def format_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+class PayloadCounter:
+    """
+    Response bytes received per endpoint. When a projected (fields=)
+    request is also sampled without its projection, the ratio between
+    the two is used to estimate how many bytes the projection saved.
+    """
+
+    def __init__(self):
+        self.received = {}
+        self.baseline = {}     # endpoint -> (projected bytes, full bytes)
+        self._lock = threading.Lock()
+
+    def add(self, endpoint: str, nbytes: int):
+        with self._lock:
+            self.received[endpoint] = self.received.get(endpoint, 0) + nbytes
+
+    def add_baseline(self, endpoint: str, projected: int, full: int):
+        with self._lock:
+            self.baseline[endpoint] = (projected, full)
+
+    def saved(self, endpoint: str) -> float | None:
+        """
+        Estimated bytes not downloaded thanks to fields= (None if unsampled).
+        """
+        if endpoint not in self.baseline or not self.baseline[endpoint][0]:
+            return None
+        projected, full = self.baseline[endpoint]
+        return self.received.get(endpoint, 0) * (full / projected - 1)
+
+    def summary(self) -> str:
+        parts = []
+        for ep, nbytes in sorted(self.received.items()):
+            part = f"{ep}: {format_bytes(nbytes)}"
+            saved = self.saved(ep)
+            if saved is not None:
+                part += f" (~{format_bytes(saved)} saved by fields=)"
+            parts.append(part)
+        total = format_bytes(sum(self.received.values()))
+        return f"Payload received: {total}" + (f" ({', '.join(parts)})" if parts else "")
+
+
+def estimate_quota(calls: dict) -> int:
+    """
+    Quota units for a planned job, given {endpoint: number of calls}.
+    """
+    return sum(QUOTA_COSTS.get(ep, 1) * n for ep, n in calls.items())
+
+
+def endpoint_of(url: str) -> str:
+    """
+    "https://www.googleapis.com/youtube/v3/commentThreads" -> "commentThreads"
+    """
+    return urlparse(url).path.rstrip("/").rsplit("/", 1)[-1]
+
+
+def retry_after_seconds(resp) -> float | None:
+    """
+    Parse a Retry-After header (delta-seconds or HTTP date), if present.
+    """
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, retry_after: float | None = None,
+                  base: float = BACKOFF_BASE, cap: float = BACKOFF_CAP) -> float:
+    """
+    Seconds to wait before retry number `attempt` (0-based): Retry-After
+    when given, otherwise "full jitter" exponential backoff.
+    """
+    if retry_after is not None:
+        return retry_after
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def error_reason(resp) -> str | None:
+    """
+    First error reason from a Google API error body (e.g. "quotaExceeded").
+    """
+    try:
+        return resp.json()["error"]["errors"][0]["reason"]
+    except (ValueError, KeyError, IndexError, TypeError):
+        return None
+
+
+KEY_PARAM_RE = re.compile(r"([?&]key=)[^&#\s'\"]+")
+
+
+def describe_error(e: BaseException) -> str:
+    """
+    One-line description of a failed call for summaries and logs. HTTP
+    errors are reduced to status and API error reason, and any key=
+    query parameter is masked: request URLs carry the API key.
+    """
+    resp = getattr(e, "response", None)
+    if resp is not None and getattr(resp, "status_code", None) is not None:
+        return f"HTTP {resp.status_code} ({error_reason(resp) or resp.reason or 'no reason'})"
+    return KEY_PARAM_RE.sub(r"\1***", f"{type(e).__name__}: {e}")
+
+
+def should_retry(resp) -> bool:
+    if resp.status_code in RETRY_STATUSES:
+        return True
+    return resp.status_code == 403 and error_reason(resp) in RETRY_403_REASONS
+
+
+class RequestScheduler:
+    """
+    Rate limiting, quota accounting and retries around the pooled
+    api_client sessions. One instance is meant to be shared by every
+    thread of a run.
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST,
+                 budget: int | None = None, max_retries: int = MAX_RETRIES,
+                 measure_savings: bool = False, max_in_flight: int | None = None):
+        self.bucket = TokenBucket(rate, burst)
+        self._in_flight = threading.BoundedSemaphore(max_in_flight) if max_in_flight else None
+        self.ledger = QuotaLedger(budget)
+        self.payload = PayloadCounter()
+        self.metrics = RequestMetrics()
+        self.max_retries = max_retries
+        self.measure_savings = measure_savings
+        self.retries = 0
+
+    def configure(self, rate: float | None = None, budget: int | None = None,
+                  max_retries: int | None = None, measure_savings: bool | None = None,
+                  max_in_flight: int | None = None):
+        """
+        Adjust limits (e.g. from command-line options) before a run.
+        max_in_flight caps the number of requests open at once across
+        all threads.
+        """
+        if rate is not None:
+            self.bucket.rate = check_rate(rate)
+        if budget is not None:
+            self.ledger.budget = budget
+        if max_retries is not None:
+            self.max_retries = max_retries
+        if measure_savings is not None:
+            self.measure_savings = measure_savings
+        if max_in_flight is not None:
+            self._in_flight = threading.BoundedSemaphore(max_in_flight)
+
+    def get(self, url: str, params=None, timeout: float = 30, **kwargs):
+        endpoint = endpoint_of(url)
+        attempt = 0
+        while True:
+            # Every attempt is charged: failed calls still cost quota
+            self.ledger.charge(endpoint)
+            self.bucket.acquire()
+            # Status retries happen here (so they are charged), urllib3
+            # only retries transport errors
+            resp = self._send(endpoint, url, params, timeout, **kwargs)
+            if resp.status_code == 403 and error_reason(resp) == QUOTA_EXHAUSTED_REASON:
+                self.payload.add(endpoint, len(resp.content))
+                raise QuotaExhausted(f"{endpoint}: the API reports the daily quota is used up "
+                                     f"({QUOTA_EXHAUSTED_REASON}).")
+            if attempt >= self.max_retries or not should_retry(resp):
+                self.payload.add(endpoint, len(resp.content))
+                if (self.measure_savings and resp.ok and params and "fields" in params
+                        and endpoint not in self.payload.baseline):
+                    self._sample_baseline(endpoint, url, params, timeout, len(resp.content))
+                return resp
+
+            delay = backoff_delay(attempt, retry_after_seconds(resp))
+            print(f"{endpoint}: HTTP {resp.status_code} ({error_reason(resp) or 'no reason'}), "
+                  f"retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries})")
+            self.retries += 1
+            self.metrics.retry(endpoint)
+            attempt += 1
+            time.sleep(delay)
+
+    def json(self, resp):
+        """
+        resp.json(), timed into the metrics of resp's endpoint.
+        """
+        start = time.perf_counter()
+        data = resp.json()
+        self.metrics.decode(endpoint_of(resp.url), time.perf_counter() - start)
+        return data
+
+    def _send(self, endpoint: str, url: str, params, timeout: float, **kwargs):
+        start = time.perf_counter()
+        if self._in_flight is None:
+            resp = api_client.get(url, params=params, timeout=timeout,
+                                  retry_statuses=False, **kwargs)
+        else:
+            with self._in_flight:
+                resp = api_client.get(url, params=params, timeout=timeout,
+                                      retry_statuses=False, **kwargs)
+        # .content reads the whole body, so this includes the download
+        nbytes = len(resp.content)
+        self.metrics.record(endpoint, resp.status_code, time.perf_counter() - start, nbytes)
+        return resp
+
+    def _sample_baseline(self, endpoint: str, url: str, params: dict,
+                         timeout: float, projected: int):
+        """
+        Repeat one projected request without fields= to size what the
+        projection saves (charged like any other call). Skipped when the
+        budget can't cover it: the real response is already in hand.
+        """
+        if not self.ledger.try_charge(endpoint):
+            return
+        self.bucket.acquire()
+        full = {k: v for k, v in params.items() if k != "fields"}
+        resp = self._send(endpoint, url, full, timeout)
+        if resp.ok:
+            self.payload.add_baseline(endpoint, projected, len(resp.content))
+
+
+def format_estimate(calls: dict) -> str:
+    """
+    Human-readable dry-run estimate for {endpoint: number of calls}.
+    """
+    lines = [f"  {ep}: {n} calls x {QUOTA_COSTS.get(ep, 1)} units" for ep, n in calls.items()]
+    lines.append(f"  total: {estimate_quota(calls)} units")
+    return "\n".join(lines)
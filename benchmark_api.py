@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark of the API fetching strategies against a local
+fake_youtube_api.py server, so no quota or network is involved.
+
+    python benchmark_api.py --videos 3 --threads 2000 --latency 0.02
+    python benchmark_api.py --fixture recorded.json --strategies threaded,inline --repeat 3
+
+Each strategy runs in a fresh process (so peak RSS is its own) and
+reports requests/sec, comments/sec (rows/sec for top20) and peak RSS:
+    serial    fetch_all_comments, replies fetched one thread at a time
+    threaded  fetch_all_comments with REPLY_WORKERS reply fetchers
+    inline    threaded, using the replies embedded in commentThreads
+    pipeline  threaded, via iter_comment_threads_pipelined (fetch and
+              normalize in their own threads, bounded queues)
+    channel   iter_channel_threads over the fixture's channel (inline)
+    top20     youtubeTop20ResultsViewLikeRatio top20_table
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import importlib.util
+import multiprocessing
+
+from api_scheduler import positive_rate
+from fake_youtube_api import FakeYouTubeAPI, add_fixture_args, fixture_from_args
+
+# --------- Config ----------
+STRATEGIES = ("serial", "threaded", "inline", "pipeline", "channel", "top20")
+TOP20_SCRIPT = "youtubeTop20ResultsViewLikeRatio2025-10-29.py"
+DEFAULT_RATE = 1000        # client requests/sec; high so the server is the limit
+DEFAULT_QUERY = "benchmark"
+# ---------------------------
+
+
+def peak_rss_bytes() -> int | None:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def load_top20():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), TOP20_SCRIPT)
+    spec = importlib.util.spec_from_file_location("top20", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_strategy(name: str, base: str, rate: float, video_ids: list,
+                 channel_id: str | None, query: str) -> dict:
+    """
+    Run one strategy in this process against base; returns its measurements.
+    """
+    if name == "top20":
+        module = load_top20()
+    else:
+        import youtube_comments_dump as module
+    module.BASE = base
+    module.API_KEY = module.API_KEY or "benchmark"
+    module.SCHEDULER.configure(rate=rate)
+
+    rows = 0
+    start = time.perf_counter()
+    if name == "top20":
+        with tempfile.TemporaryDirectory() as tmp:
+            df, _ = module.top20_table(query, out_dir=tmp)
+        rows = len(df)
+    elif name == "channel":
+        for _, thread in module.iter_channel_threads(channel_id, inline_replies=True):
+            rows += len(thread)
+    elif name == "pipeline":
+        for video_id in video_ids:
+            for _, thread in module.iter_comment_threads_pipelined(video_id):
+                rows += len(thread)
+    else:
+        workers = 1 if name == "serial" else module.REPLY_WORKERS
+        for video_id in video_ids:
+            rows += len(module.fetch_all_comments(video_id, workers=workers,
+                                                  inline_replies=name == "inline"))
+    seconds = time.perf_counter() - start
+
+    requests_made = sum(module.SCHEDULER.ledger.calls.values())
+    return {
+        "strategy": name,
+        "seconds": seconds,
+        "requests": requests_made,
+        "retries": module.SCHEDULER.retries,
+        "rows": rows,
+        "requests_per_sec": requests_made / seconds if seconds else None,
+        "rows_per_sec": rows / seconds if seconds else None,
+        "peak_rss": peak_rss_bytes(),
+    }
+
+
+def _child(conn, *args):
+    try:
+        conn.send(run_strategy(*args))
+    except Exception as e:
+        conn.send({"strategy": args[0], "error": f"{type(e).__name__}: {e}"})
+    finally:
+        conn.close()
+
+
+def run_isolated(*args) -> dict:
+    """
+    run_strategy in a fresh (spawned) process.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    parent, child = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_child, args=(child, *args))
+    proc.start()
+    child.close()
+    try:
+        result = parent.recv()
+    except EOFError:
+        result = {"strategy": args[0], "error": "worker exited without a result"}
+    proc.join()
+    return result
+
+
+def format_rss(n: int | None) -> str:
+    return "n/a" if n is None else f"{n / 2 ** 20:.1f} MiB"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark API fetching strategies against a local fake API."
+    )
+    add_fixture_args(parser)
+    parser.add_argument("--strategies", default=",".join(STRATEGIES),
+                        help=f"Comma-separated strategies (default: {','.join(STRATEGIES)})")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per strategy (default: 1)")
+    parser.add_argument("--rate", type=positive_rate, default=DEFAULT_RATE,
+                        help=f"Client rate limit in requests/sec (default: {DEFAULT_RATE})")
+    parser.add_argument("--query", default=DEFAULT_QUERY, help="Search query for top20")
+    parser.add_argument("--json", default=None, help="Also write the results to this JSON file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    strategies = [s.strip() for s in args.strategies.split(",") if s.strip()]
+    unknown = set(strategies) - set(STRATEGIES)
+    if unknown:
+        raise SystemExit(f"Unknown strategies: {', '.join(sorted(unknown))}")
+
+    fixture = fixture_from_args(args)
+    video_ids = list(fixture["videos"])
+    total = sum(len(t) for v in fixture["videos"].values() for t in v["threads"])
+    print(f"Fixture: {len(video_ids)} videos, {total} comments")
+
+    results = []
+    with FakeYouTubeAPI(fixture, latency=args.latency, jitter=args.jitter,
+                        error_403=args.error_403, error_429=args.error_429,
+                        retry_after=args.retry_after, seed=args.seed) as api:
+        for name in strategies:
+            for run in range(args.repeat):
+                errors_before = sum(api.stats["errors"].values())
+                result = run_isolated(name, api.base, args.rate, video_ids,
+                                      fixture.get("channel_id"), args.query)
+                result["run"] = run + 1
+                result["injected_errors"] = sum(api.stats["errors"].values()) - errors_before
+                results.append(result)
+                if "error" in result:
+                    print(f"{name:<9} run {run + 1}: FAILED {result['error']}")
+                    continue
+                print(f"{name:<9} run {run + 1}: {result['seconds']:7.2f}s  "
+                      f"{result['requests_per_sec']:8.1f} req/s  "
+                      f"{result['rows_per_sec']:10.1f} rows/s  "
+                      f"peak RSS {format_rss(result['peak_rss'])}  "
+                      f"({result['requests']} requests, {result['retries']} retries, "
+                      f"{result['injected_errors']} injected errors, {result['rows']} rows)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved to: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark: comments held as a list of dicts (what
+fetch_all_comments used to return) vs comment_columns.CommentColumns.
+
+    python benchmark_memory.py --comments 1000000
+
+Comments are decoded from synthetic JSON API pages and converted with
+comment_from_snippet, as the fetchers do, so every string is a fresh
+object just like after a real resp.json(). Memory is measured with
+tracemalloc after each structure is built (tracing slows the build down,
+so treat build times as relative).
+"""
+import gc
+import json
+import time
+import random
+import argparse
+import tracemalloc
+
+from comment_columns import CommentColumns
+from youtube_comments_dump import comment_from_snippet
+
+# --------- Config ----------
+DEFAULT_COMMENTS = 200000
+PAGE_SIZE = 100            # comments per synthetic API page
+AUTHORS_PER_COMMENT = 0.3  # distinct authors per comment (repeat commenters)
+# ---------------------------
+
+WORDS = ("great", "video", "thanks", "love", "this", "song", "why", "is", "nobody",
+         "talking", "about", "the", "ending", "lol", "wow", "anyone", "here", "still",
+         "watching", "best", "part", "was", "so", "good")
+
+
+def synthetic_pages(n: int, seed: int = 0) -> list:
+    """
+    comments.list-style JSON pages (encoded) holding n comments in total.
+    """
+    rng = random.Random(seed)
+    n_authors = max(1, int(n * AUTHORS_PER_COMMENT))
+    start = 1704067200
+    parent = None
+    pages = []
+    for first in range(0, n, PAGE_SIZE):
+        items = []
+        for i in range(first, min(first + PAGE_SIZE, n)):
+            if i % 4 == 0:
+                parent = f"Ugz{i:020d}"
+                cid, pid = parent, None
+            else:
+                cid, pid = f"{parent}.{i:022d}", parent
+            when = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(start + i))
+            items.append({"id": cid, "parentId": pid, "snippet": {
+                "authorDisplayName": f"@user{int(rng.paretovariate(1.1)) % n_authors}",
+                "publishedAt": when, "updatedAt": when,
+                "likeCount": int(rng.paretovariate(1.3)) - 1,
+                "textOriginal": " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 30))),
+            }})
+        pages.append(json.dumps({"items": items}))
+    return pages
+
+
+def iter_comments(pages: list):
+    # Decoding each page here makes every string a fresh object, as after resp.json()
+    for raw in pages:
+        for item in json.loads(raw)["items"]:
+            yield comment_from_snippet(item["id"], item["parentId"], item["snippet"])
+
+
+def measure(build, pages: list) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    obj = build(iter_comments(pages))
+    build_seconds = time.perf_counter() - start
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for c in obj:
+        c["author"], c["like_count"], c["published_at"]
+    read_seconds = time.perf_counter() - start
+    return {"bytes": current, "peak": peak, "build_seconds": build_seconds,
+            "read_seconds": read_seconds}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Compare memory use of comment dicts and CommentColumns."
+    )
+    parser.add_argument("--comments", type=int, default=DEFAULT_COMMENTS,
+                        help=f"Number of synthetic comments (default: {DEFAULT_COMMENTS})")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    n = args.comments
+    pages = synthetic_pages(n)
+    results = {
+        "list of dicts": measure(list, pages),
+        "CommentColumns": measure(CommentColumns, pages),
+    }
+    base = results["list of dicts"]["bytes"]
+    print(f"{n} comments")
+    for name, r in results.items():
+        print(f"{name:<15} {r['bytes'] / 2 ** 20:9.1f} MiB  ({r['bytes'] / n:6.0f} B/comment, "
+              f"{r['bytes'] / base:5.0%} of dicts)  peak {r['peak'] / 2 ** 20:.1f} MiB  "
+              f"build {r['build_seconds']:.2f}s  read {r['read_seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Aggregate statistics of a comment dump, computed column-wise.
+
+    python comment_analytics.py analyze DUMP.txt            # or .txt.gz/.jsonl/.parquet/.arrow
+    python comment_analytics.py analyze DUMP.manifest.json  # all shards of a sharded dump
+    python comment_analytics.py analyze comments.sqlite3 --video VIDEO_ID --out summary.json
+
+The dump (any output format of youtube_comments_dump.py) is loaded into
+Arrow columns, only the ones the statistics need, and everything is
+computed with NumPy bincount / histogram / percentile over integer
+codes (authors and parent_ids are dictionary-encoded by Arrow), so no
+Python-level loop runs per comment:
+    velocity      comments per hour and per day (UTC), peak hour,
+                  comments in the first 24 hours / 7 days
+    likes         percentiles, share without likes, log-scale histogram
+    authors       distinct authors, top authors by comments (with likes)
+    reply_depth   replies per thread: percentiles, histogram, share of
+                  threads with replies, replies whose thread is missing
+                  (the API nests replies one level deep, so max_depth is
+                  at most 1)
+The summary is written as JSON and a short report is printed.
+Needs pyarrow and numpy (pip install pyarrow).
+"""
+import os
+import json
+import time
+import sqlite3
+import argparse
+
+from comment_dump_reader import to_arrow
+from comment_formats import require_pyarrow
+from youtube_comments_dump import read_shard_manifest
+
+# --------- Config ----------
+TOP_AUTHORS = 20
+FIRST_HOURS = 168          # hourly counts kept in the summary (first week)
+LIKE_BINS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+REPLY_BINS = (0, 1, 2, 6, 21, 101)
+# ---------------------------
+
+ANALYSIS_COLUMNS = ("video_id", "comment_id", "parent_id", "is_reply", "author",
+                    "published_at", "like_count")
+MAGIC = {
+    b"SQLite format 3\x00": "sqlite",
+    b"PAR1": "parquet",
+    b"ARROW1": "arrow",
+}
+
+
+def detect_format(path: str) -> str:
+    """
+    "sqlite", "parquet", "arrow", "jsonl", "manifest" (of a sharded text
+    dump) or "text" (plain or compressed).
+    """
+    # JSON too, but comment rows are only in the shards it lists
+    if path.endswith(".manifest.json"):
+        return "manifest"
+    with open(path, "rb") as f:
+        head = f.read(16)
+    for magic, fmt in MAGIC.items():
+        if head.startswith(magic):
+            return fmt
+    if path.endswith(".jsonl") or head.lstrip().startswith(b"{"):
+        return "jsonl"
+    return "text"
+
+
+def _analysis_schema(pa):
+    return pa.schema([
+        ("video_id", pa.string()),
+        ("comment_id", pa.string()),
+        ("parent_id", pa.string()),
+        ("is_reply", pa.bool_()),
+        ("author", pa.string()),
+        ("published_at", pa.string()),
+        ("like_count", pa.int64()),
+    ])
+
+
+def _load_sqlite(path: str, video_id: str | None, pa):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        sql = f"SELECT {', '.join(ANALYSIS_COLUMNS)} FROM comments"
+        rows = conn.execute(sql + " WHERE video_id = ?", (video_id,)) if video_id else conn.execute(sql)
+        columns = list(zip(*rows.fetchall())) or [()] * len(ANALYSIS_COLUMNS)
+    finally:
+        conn.close()
+    schema = _analysis_schema(pa)
+    # is_reply is stored as 0/1
+    return pa.table([pa.array(values).cast(field.type) for values, field in zip(columns, schema)],
+                    schema=schema)
+
+
+def load_table(path: str, video_id: str | None = None, processes: int | None = 1):
+    """
+    The ANALYSIS_COLUMNS of a dump in any format as a pyarrow Table
+    (published_at as UTC timestamps), optionally only video_id's rows.
+    processes: parser processes for text dumps (see comment_dump_reader).
+    """
+    pa = require_pyarrow()
+    import pyarrow.compute as pc
+
+    fmt = detect_format(path)
+    if fmt == "sqlite":
+        table = _load_sqlite(path, video_id, pa)
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+        table = pq.read_table(path, columns=list(ANALYSIS_COLUMNS))
+    elif fmt == "arrow":
+        with pa.memory_map(path) as source:
+            table = pa.ipc.open_file(source).read_all().select(list(ANALYSIS_COLUMNS))
+    elif fmt == "jsonl":
+        import pyarrow.json as pajson
+        options = pajson.ParseOptions(explicit_schema=_analysis_schema(pa),
+                                      unexpected_field_behavior="ignore")
+        table = pajson.read_json(path, parse_options=options)
+    elif fmt == "manifest":
+        shards = read_shard_manifest(path)["shards"]
+        table = pa.concat_tables([to_arrow(shard["path"], processes=processes)
+                                  .select(list(ANALYSIS_COLUMNS)) for shard in shards])
+    else:
+        table = to_arrow(path, processes=processes).select(list(ANALYSIS_COLUMNS))
+
+    published = table["published_at"]
+    if not pa.types.is_timestamp(published.type):
+        published = pc.strptime(published, format="%Y-%m-%dT%H:%M:%SZ", unit="s", error_is_null=True)
+    table = table.set_column(table.schema.get_field_index("published_at"), "published_at",
+                             published.cast(pa.timestamp("s", tz="UTC")))
+    if video_id and fmt != "sqlite":
+        table = table.filter(pc.equal(table["video_id"], video_id))
+    return table
+
+
+def _codes(column, pa):
+    """
+    (int codes as a numpy array, dictionary) of a string column; nulls
+    get code -1.
+    """
+    encoded = column.combine_chunks().dictionary_encode()
+    codes = encoded.indices.fill_null(-1).to_numpy(zero_copy_only=False)
+    return codes, encoded.dictionary
+
+
+def _percentiles(np, values) -> dict:
+    if not len(values):
+        return {"p50": None, "p90": None, "p99": None, "p999": None, "max": None, "mean": None}
+    p = np.percentile(values, [50, 90, 99, 99.9])
+    return {"p50": float(p[0]), "p90": float(p[1]), "p99": float(p[2]), "p999": float(p[3]),
+            "max": int(values.max()), "mean": float(values.mean())}
+
+
+def _histogram(np, values, bins) -> list:
+    """
+    [{"from": low, "to": high or None, "count": n}, ...] for bins and an
+    open-ended last bucket.
+    """
+    edges = np.array(list(bins) + [np.iinfo(np.int64).max], dtype=np.int64)
+    counts, _ = np.histogram(values, bins=edges)
+    return [{"from": int(low), "to": int(high) - 1 if i < len(bins) - 1 else None,
+             "count": int(n)}
+            for i, (low, high, n) in enumerate(zip(edges[:-1], edges[1:], counts))]
+
+
+def _iso(np, seconds) -> str:
+    return str(np.datetime64(int(seconds), "s")) + "Z"
+
+
+def velocity(np, published) -> dict:
+    if not len(published):
+        return {"first": None, "last": None}
+    hours = published // 3600
+    first_hour = hours.min()
+    per_hour = np.bincount(hours - first_hour)
+    days = published // 86400
+    per_day = np.bincount(days - days.min())
+    peak = int(per_hour.argmax())
+    active = per_hour[per_hour > 0]
+    return {
+        "first": _iso(np, published.min()),
+        "last": _iso(np, published.max()),
+        "peak_hour": _iso(np, (first_hour + peak) * 3600),
+        "peak_hour_comments": int(per_hour[peak]),
+        "active_hours": int(len(active)),
+        "median_per_active_hour": float(np.median(active)),
+        "first_24h": int(per_hour[:24].sum()),
+        "first_7d": int(per_hour[:168].sum()),
+        "per_hour": {"start": _iso(np, first_hour * 3600),
+                     "counts": per_hour[:FIRST_HOURS].tolist()},
+        "per_day": {"start": _iso(np, days.min() * 86400)[:10], "counts": per_day.tolist()},
+    }
+
+
+def analyze(table, top_authors: int = TOP_AUTHORS) -> dict:
+    """
+    The summary dict of a load_table() table.
+    """
+    import numpy as np
+    pa = require_pyarrow()
+    import pyarrow.compute as pc
+
+    is_reply = table["is_reply"].fill_null(False).to_numpy(zero_copy_only=False).astype(bool)
+    likes = table["like_count"].fill_null(0).to_numpy(zero_copy_only=False).astype(np.int64)
+    published = table["published_at"].cast(pa.int64())
+    has_time = published.is_valid().to_numpy(zero_copy_only=False).astype(bool)
+    published = published.fill_null(0).to_numpy(zero_copy_only=False)[has_time]
+
+    # Authors: bincount over dictionary codes
+    author_codes, author_names = _codes(table["author"].fill_null(""), pa)
+    per_author = np.bincount(author_codes, minlength=len(author_names))
+    likes_per_author = np.bincount(author_codes, weights=likes, minlength=len(author_names))
+    k = min(top_authors, len(per_author))
+    top = np.argpartition(-per_author, k - 1)[:k] if k else np.array([], dtype=np.int64)
+    top = top[np.lexsort((top, -per_author[top]))]
+    names = author_names.take(pa.array(top)).to_pylist()
+
+    # Threads: replies counted per parent_id, matched against the top-level ids
+    reply_parents = table["parent_id"].filter(pa.array(is_reply))
+    parent_codes, parents = _codes(reply_parents, pa)
+    parent_codes = parent_codes[parent_codes >= 0]
+    per_parent = np.bincount(parent_codes, minlength=len(parents))
+    top_ids = table["comment_id"].filter(pa.array(~is_reply))
+    known = pc.is_in(parents, value_set=top_ids.combine_chunks()).to_numpy(zero_copy_only=False)
+    threads = int((~is_reply).sum())
+    replies_per_thread = np.zeros(threads, dtype=np.int64)
+    replies_per_thread[:int(known.sum())] = per_parent[known]
+
+    n = len(likes)
+    return {
+        "comments": n,
+        "top_level": threads,
+        "replies": int(is_reply.sum()),
+        "videos": pc.count_distinct(table["video_id"]).as_py(),
+        "velocity": velocity(np, published),
+        "likes": {
+            **_percentiles(np, likes),
+            "total": int(likes.sum()),
+            "zero_share": float((likes == 0).mean()) if n else None,
+            "top_level_mean": float(likes[~is_reply].mean()) if threads else None,
+            "reply_mean": float(likes[is_reply].mean()) if is_reply.any() else None,
+            "histogram": _histogram(np, likes, LIKE_BINS),
+        },
+        "authors": {
+            "distinct": int(len(per_author)),
+            "single_comment_share": float((per_author == 1).mean()) if len(per_author) else None,
+            "top_share": float(per_author[top].sum() / n) if n else None,
+            "top": [{"author": name, "comments": int(per_author[i]), "likes": int(likes_per_author[i])}
+                    for name, i in zip(names, top)],
+        },
+        "reply_depth": {
+            "max_depth": 1 if is_reply.any() else 0,
+            "threads_with_replies": int((replies_per_thread > 0).sum()),
+            "orphan_replies": int(per_parent[~known].sum()),
+            "replies_per_thread": _percentiles(np, replies_per_thread),
+            "histogram": _histogram(np, replies_per_thread, REPLY_BINS),
+        },
+    }
+
+
+def summary_lines(summary: dict) -> list:
+    v, likes, authors, depth = (summary[k] for k in ("velocity", "likes", "authors", "reply_depth"))
+    lines = [f"{summary['comments']} comments ({summary['top_level']} top-level, "
+             f"{summary['replies']} replies) from {summary['videos']} video(s)"]
+    if v["first"]:
+        lines.append(f"Velocity: {v['first']} .. {v['last']}; peak {v['peak_hour_comments']}/h at "
+                     f"{v['peak_hour']}; first 24h {v['first_24h']}, first 7d {v['first_7d']}")
+    if summary["comments"]:
+        lines.append(f"Likes: p50 {likes['p50']:g}, p90 {likes['p90']:g}, p99 {likes['p99']:g}, "
+                     f"max {likes['max']}; {likes['zero_share']:.0%} without likes")
+        top = ", ".join(f"{a['author']} ({a['comments']})" for a in authors["top"][:5])
+        lines.append(f"Authors: {authors['distinct']} distinct; top: {top}")
+    if summary["top_level"]:
+        rpt = depth["replies_per_thread"]
+        lines.append(f"Replies per thread: mean {rpt['mean']:.2f}, p99 {rpt['p99']:g}, max {rpt['max']}; "
+                     f"{depth['threads_with_replies']} threads with replies, "
+                     f"{depth['orphan_replies']} orphan replies")
+    return lines
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Statistics of comment dumps.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_analyze = sub.add_parser("analyze", help="Summarize a dump (any output format)")
+    p_analyze.add_argument("dump", help="Text (plain or compressed), jsonl, parquet, arrow or sqlite dump")
+    p_analyze.add_argument("--video", default=None, help="Only this video ID (multi-video dumps)")
+    p_analyze.add_argument("--top", type=int, default=TOP_AUTHORS,
+                           help=f"Top authors to list (default: {TOP_AUTHORS})")
+    p_analyze.add_argument("--out", default=None,
+                           help="Summary JSON file (default: <dump>.summary.json)")
+    p_analyze.add_argument("--processes", type=int, default=1,
+                           help="Parser processes for text dumps (default: 1; 0 = all CPUs)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.command == "analyze":
+        start = time.perf_counter()
+        table = load_table(args.dump, video_id=args.video, processes=args.processes or None)
+        loaded = time.perf_counter()
+        summary = analyze(table, top_authors=args.top)
+        done = time.perf_counter()
+        summary["source"] = os.path.abspath(args.dump)
+        summary["seconds"] = {"load": loaded - start, "analyze": done - loaded}
+
+        out = args.out or args.dump + ".summary.json"
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        for line in summary_lines(summary):
+            print(line)
+        print(f"Loaded in {loaded - start:.2f}s, analyzed in {done - loaded:.2f}s.")
+        print("Saved to:", out)
+
+
+if __name__ == "__main__":
+    main()
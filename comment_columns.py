@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Column-buffer storage for large numbers of comments.
+
+A comment dict costs several hundred bytes of per-object overhead on top
+of its strings. CommentColumns keeps one buffer per field instead:
+    - like counts and timestamps in array("q") (timestamps as epoch
+      seconds; values that don't round-trip through the API's
+      "YYYY-MM-DDTHH:MM:SSZ" form are kept verbatim on the side),
+    - is_reply flags in a bytearray,
+    - author names and parent_ids interned, so repeat authors and the
+      parent_id shared by all replies of a thread are stored once,
+    - comment_id and text as plain string lists.
+Indexing or iterating yields CommentView objects, read-only Mappings
+with the same keys and values as the comment dicts, so code written
+for dicts (c["author"], c.get(...), dict(c)) keeps working.
+"""
+import sys
+from array import array
+from collections.abc import Mapping
+from datetime import date
+
+KEYS = ("comment_id", "parent_id", "is_reply", "author", "published_at",
+        "updated_at", "like_count", "text")
+NO_TIME = -(2 ** 63)       # "" (missing timestamp) or kept verbatim in _odd_times
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# "YYYY-MM-DD" <-> days since the epoch; comments cluster on few days,
+# so caching the date part beats datetime parsing/formatting per value.
+_day_numbers = {}
+_day_strings = {}
+
+
+def _intern(s):
+    return sys.intern(s) if s else s
+
+
+def parse_timestamp(s: str) -> int | None:
+    """
+    "YYYY-MM-DDTHH:MM:SSZ" -> epoch seconds; None for any other form.
+    """
+    if len(s) != 20 or s[10] != "T" or s[-1] != "Z":
+        return None
+    day = _day_numbers.get(s[:10])
+    try:
+        if day is None:
+            day = _day_numbers[s[:10]] = date.fromisoformat(s[:10]).toordinal() - EPOCH_ORDINAL
+        h, m, sec = int(s[11:13]), int(s[14:16]), int(s[17:19])
+    except ValueError:
+        return None
+    if s[13] != ":" or s[16] != ":" or not (h < 24 and m < 60 and sec < 60):
+        return None
+    return day * 86400 + h * 3600 + m * 60 + sec
+
+
+def format_timestamp(t: int) -> str:
+    """
+    Epoch seconds -> "YYYY-MM-DDTHH:MM:SSZ".
+    """
+    day, rest = divmod(t, 86400)
+    prefix = _day_strings.get(day)
+    if prefix is None:
+        prefix = _day_strings[day] = date.fromordinal(day + EPOCH_ORDINAL).isoformat()
+    h, rest = divmod(rest, 3600)
+    m, sec = divmod(rest, 60)
+    return f"{prefix}T{h:02d}:{m:02d}:{sec:02d}Z"
+
+
+class CommentColumns:
+    """
+    Append-only, list-like container of comments stored column-wise.
+        cols.append(c) / cols.extend(cs)  -> add comment dicts (or views)
+        cols[i], iter(cols), len(cols)     -> CommentView(s)
+        cols.to_dicts()                    -> plain list of dicts
+    """
+
+    def __init__(self, comments=()):
+        self.comment_id = []
+        self.parent_id = []
+        self.is_reply = bytearray()
+        self.author = []
+        self.published_at = array("q")
+        self.updated_at = array("q")
+        self.like_count = array("q")
+        self.text = []
+        self._odd_times = {}     # (column, row) -> timestamp string kept as-is
+        self.extend(comments)
+
+    def _time(self, column: str, row: int, s: str) -> int:
+        if not s:
+            return NO_TIME
+        t = parse_timestamp(s)
+        if t is None:
+            self._odd_times[column, row] = s
+            return NO_TIME
+        return t
+
+    def append(self, c):
+        row = len(self.comment_id)
+        published, updated = c["published_at"], c["updated_at"]
+        self.comment_id.append(c["comment_id"])
+        self.parent_id.append(_intern(c["parent_id"]))
+        self.is_reply.append(1 if c["is_reply"] else 0)
+        self.author.append(_intern(c["author"]))
+        t = self._time("published_at", row, published)
+        self.published_at.append(t)
+        # Most comments were never edited
+        if updated == published and t != NO_TIME:
+            self.updated_at.append(t)
+        else:
+            self.updated_at.append(self._time("updated_at", row, updated))
+        self.like_count.append(int(c["like_count"]))
+        self.text.append(c["text"])
+
+    def extend(self, comments):
+        for c in comments:
+            self.append(c)
+
+    def timestamp(self, column: str, row: int) -> str:
+        """
+        The ISO string of published_at / updated_at at row.
+        """
+        t = getattr(self, column)[row]
+        if t == NO_TIME:
+            return self._odd_times.get((column, row), "")
+        return format_timestamp(t)
+
+    def __len__(self):
+        return len(self.comment_id)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [CommentView(self, row) for row in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("comment index out of range")
+        return CommentView(self, i)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield CommentView(self, row)
+
+    def to_dicts(self) -> list:
+        return [dict(c) for c in self]
+
+
+class CommentView(Mapping):
+    """
+    Read-only dict view of one row of a CommentColumns.
+    """
+
+    __slots__ = ("_cols", "_row")
+
+    def __init__(self, cols: CommentColumns, row: int):
+        self._cols = cols
+        self._row = row
+
+    def __getitem__(self, key):
+        cols, row = self._cols, self._row
+        if key == "is_reply":
+            return bool(cols.is_reply[row])
+        if key in ("published_at", "updated_at"):
+            return cols.timestamp(key, row)
+        if key in KEYS:
+            return getattr(cols, key)[row]
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(KEYS)
+
+    def __len__(self):
+        return len(KEYS)
+
+    def __repr__(self):
+        return f"CommentView({dict(self)!r})"
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Delta dumps: record only what changed since the previous snapshot.
+
+A snapshot is a text dump (the base, plain or compressed) plus the
+deltas written against it so far:
+    <base>.delta001.jsonl, <base>.delta002.jsonl, ...
+where <base> is the dump path without its extension. Each delta is a
+JSONL file: a header line, then one line per changed comment:
+    {"op": "insert", <comment fields>}   new comment
+    {"op": "update", <comment fields>}   updated_at or like_count changed
+    {"op": "delete", "comment_id": ..., "parent_id": ...}
+
+Changes are found with a hashed key index of the previous snapshot: an
+8-byte hash of each comment_id (comment_index.key_hash) mapped to an
+8-byte hash of its updated_at and like_count, so the index costs two
+ints per comment however long the texts are.
+
+    python youtube_comments_dump.py VIDEO --delta    # fetch, write the next delta
+    python comment_delta.py compact BASE.txt          # fold deltas into a new base
+    python comment_delta.py status BASE.txt           # list deltas and their counts
+"""
+import os
+import re
+import glob
+import json
+import time
+import argparse
+from hashlib import blake2b
+
+from comment_index import index_path, key_hash
+from dump_codecs import CODECS, detect_codec
+from youtube_comments_dump import (
+    CommentDumpWriter, comments_file_path, dump_extension, iter_comments_from_file,
+    read_dump_header,
+)
+
+DELTA_VERSION = 1
+DELTA_RE = re.compile(r"\.delta(\d+)\.jsonl$")
+FIELDS = ("comment_id", "parent_id", "is_reply", "author", "published_at",
+          "updated_at", "like_count", "text")
+
+
+def fingerprint(c) -> int:
+    """
+    Hash of the fields whose change makes a comment "updated".
+    """
+    key = f"{c['updated_at']}\x00{int(c['like_count'])}".encode("utf-8")
+    return int.from_bytes(blake2b(key, digest_size=8).digest(), "little")
+
+
+def base_root(base_path: str) -> str:
+    """
+    base_path without its dump extension (.txt, .txt.gz, ...).
+    """
+    for codec in (*CODECS, None):
+        ext = dump_extension(codec)
+        if base_path.endswith(ext):
+            return base_path[:-len(ext)]
+    return os.path.splitext(base_path)[0]
+
+
+def delta_paths(base_path: str) -> list:
+    """
+    The deltas of base_path, oldest first.
+    """
+    found = []
+    for path in glob.glob(glob.escape(base_root(base_path)) + ".delta*.jsonl"):
+        m = DELTA_RE.search(path)
+        if m:
+            found.append((int(m.group(1)), path))
+    return [path for _, path in sorted(found)]
+
+
+def read_delta(path: str):
+    """
+    (header, iterator of records) of one delta file.
+    """
+    f = open(path, encoding="utf-8")
+    header = json.loads(f.readline())
+    if header.get("delta") != DELTA_VERSION:
+        f.close()
+        raise ValueError(f"{path} is not a version {DELTA_VERSION} delta file.")
+
+    def records():
+        with f:
+            for line in f:
+                yield json.loads(line)
+    return header, records()
+
+
+def check_delta(base_path: str, path: str) -> dict:
+    """
+    The header of delta `path`; ValueError if it was written against a
+    different version of base_path.
+    """
+    header, records = read_delta(path)
+    records.close()
+    if header["base_size"] != os.path.getsize(base_path):
+        raise ValueError(f"{path} was written against a different version of {base_path} "
+                         f"(size {header['base_size']}, now {os.path.getsize(base_path)}).")
+    return header
+
+
+def snapshot_index(base_path: str) -> dict:
+    """
+    Hashed key index of the snapshot base + deltas:
+    key_hash(comment_id) -> fingerprint.
+    """
+    index = {}
+    for c in iter_comments_from_file(base_path):
+        index[key_hash(c["comment_id"])] = fingerprint(c)
+    for path in delta_paths(base_path):
+        check_delta(base_path, path)
+        _, records = read_delta(path)
+        for rec in records:
+            if rec["op"] == "delete":
+                index.pop(key_hash(rec["comment_id"]), None)
+            else:
+                index[key_hash(rec["comment_id"])] = fingerprint(rec)
+    return index
+
+
+def snapshot_comments(base_path: str):
+    """
+    Yield (comment_id, parent_id) of every comment ever in the snapshot
+    (used to name the comments a new delta deletes).
+    """
+    for c in iter_comments_from_file(base_path):
+        yield c["comment_id"], c["parent_id"]
+    for path in delta_paths(base_path):
+        _, records = read_delta(path)
+        for rec in records:
+            if rec["op"] == "insert":
+                yield rec["comment_id"], rec["parent_id"]
+
+
+def write_delta(base_path: str, threads, video_id: str | None = None) -> tuple:
+    """
+    Compare threads (an iterable of comment-dict lists, e.g. from
+    iter_comment_threads) against the snapshot of base_path and write the
+    changes to the next delta file. Nothing is written if nothing changed.
+    Returns (delta path or None, {"insert": n, "update": n, "delete": n}).
+    """
+    index = snapshot_index(base_path)
+    existing = delta_paths(base_path)
+    seq = int(DELTA_RE.search(existing[-1]).group(1)) + 1 if existing else 1
+    path = f"{base_root(base_path)}.delta{seq:03d}.jsonl"
+    tmp_path = path + ".tmp"
+    counts = {"insert": 0, "update": 0, "delete": 0}
+    seen = set()
+
+    header = {
+        "delta": DELTA_VERSION,
+        "video_id": video_id or read_dump_header(base_path)["video_id"],
+        "base": os.path.basename(base_path),
+        "base_size": os.path.getsize(base_path),
+        "sequence": seq,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    f = open(tmp_path, "w", encoding="utf-8", newline="\n")
+
+    def emit(op, rec):
+        counts[op] += 1
+        f.write(json.dumps({"op": op, **rec}, ensure_ascii=False) + "\n")
+
+    try:
+        with f:
+            f.write(json.dumps(header) + "\n")
+            for thread in threads:
+                for c in thread:
+                    c_hash = key_hash(c["comment_id"])
+                    seen.add(c_hash)
+                    old = index.get(c_hash)
+                    if old is None:
+                        emit("insert", {k: c[k] for k in FIELDS})
+                    elif old != fingerprint(c):
+                        emit("update", {k: c[k] for k in FIELDS})
+
+            gone = index.keys() - seen
+            if gone:
+                for comment_id, parent_id in snapshot_comments(base_path):
+                    c_hash = key_hash(comment_id)
+                    if c_hash in gone:
+                        gone.discard(c_hash)
+                        emit("delete", {"comment_id": comment_id, "parent_id": parent_id})
+    except BaseException:
+        # A failed fetch must not look like deletions on the next run
+        os.remove(tmp_path)
+        raise
+
+    if not any(counts.values()):
+        os.remove(tmp_path)
+        return None, counts
+    os.replace(tmp_path, path)
+    return path, counts
+
+
+def fold_deltas(base_path: str) -> dict:
+    """
+    The net effect of all deltas of base_path: comment_id ->
+    ("insert" | "update", comment dict, seq) or ("delete", None, seq),
+    where seq is the sequence number of the delta the change dates from
+    (for an insert, the delta that first inserted it).
+    A comment inserted and deleted again drops out entirely.
+    """
+    changes = {}
+    for path in delta_paths(base_path):
+        seq = check_delta(base_path, path)["sequence"]
+        _, records = read_delta(path)
+        for rec in records:
+            op = rec.pop("op")
+            prev = changes.get(rec["comment_id"])
+            if op == "delete":
+                if prev is not None and prev[0] == "insert":
+                    del changes[rec["comment_id"]]
+                else:
+                    changes[rec["comment_id"]] = ("delete", None, seq)
+            elif prev is None:
+                changes[rec["comment_id"]] = (op, rec, seq)
+            elif prev[0] == "insert":
+                changes[rec["comment_id"]] = ("insert", rec, prev[2])
+            else:
+                # Re-inserting a deleted base comment updates it in place
+                changes[rec["comment_id"]] = ("update", rec, seq)
+    return changes
+
+
+def compact(base_path: str, out_path: str | None = None, keep_deltas: bool = False) -> tuple:
+    """
+    Fold the deltas of base_path into a new base snapshot: updated
+    comments replace their old versions in place, deleted ones are
+    dropped, new replies follow the rest of their thread and new threads
+    come first (newest delta first), as in an incremental refresh.
+    The new base is written with the same compression as the old one to
+    out_path (default: today's dump path next to base_path, which may be
+    base_path itself); the folded deltas are removed unless keep_deltas.
+    keep_deltas needs an out_path the deltas don't attach to (not
+    base_path itself): they only apply to the old base (ValueError
+    otherwise).
+    Returns (out_path, number of comments).
+    """
+    header = read_dump_header(base_path)
+    deltas = delta_paths(base_path)
+    changes = fold_deltas(base_path)
+    codec = detect_codec(base_path)
+    if out_path is None:
+        out_path = comments_file_path(header["label"] or header["video_id"],
+                                      os.path.dirname(os.path.abspath(base_path)),
+                                      ext=dump_extension(codec))
+    # Deltas attach to a base by its path without extension
+    if keep_deltas and (os.path.abspath(base_root(out_path))
+                        == os.path.abspath(base_root(base_path))):
+        raise ValueError(f"Can't keep the deltas when {out_path} takes the place of "
+                         f"{base_path}: they would no longer match it. Compact to "
+                         "another path (--out).")
+
+    by_delta = {}        # delta seq -> its top-level inserts, in API order
+    new_replies = {}     # parent_id -> inserted replies
+    for comment_id, (op, c, seq) in changes.items():
+        if op != "insert":
+            continue
+        if c["is_reply"]:
+            new_replies.setdefault(c["parent_id"], []).append(c)
+        else:
+            by_delta.setdefault(seq, []).append(c)
+    # Later deltas hold newer threads; within one, keep the API's order
+    new_threads = [c for seq in sorted(by_delta, reverse=True) for c in by_delta[seq]]
+
+    tmp_path = out_path + ".tmp"
+    with CommentDumpWriter(tmp_path, header["video_id"], header["label"],
+                           compression=codec) as writer:
+        for c in new_threads:
+            writer.write(c)
+            writer.write_many(new_replies.pop(c["comment_id"], []))
+        thread_id = None
+        for c in iter_comments_from_file(base_path):
+            if not c["is_reply"]:
+                writer.write_many(new_replies.pop(thread_id, []))
+                thread_id = c["comment_id"]
+            op, new, _ = changes.get(c["comment_id"], (None, None, None))
+            if op == "delete":
+                continue
+            writer.write(new if new is not None else c)
+        writer.write_many(new_replies.pop(thread_id, []))
+        # Replies whose thread is gone
+        for replies in new_replies.values():
+            writer.write_many(replies)
+    # The old base may be today's file, so only replace it at the end
+    os.replace(tmp_path, out_path)
+    if os.path.exists(index_path(tmp_path)):
+        os.replace(index_path(tmp_path), index_path(out_path))
+    if not keep_deltas:
+        for path in deltas:
+            os.remove(path)
+    return out_path, writer.count
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Inspect or compact delta dumps.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_compact = sub.add_parser("compact", help="Fold a base dump's deltas into a new base")
+    p_compact.add_argument("base", help="Base dump written by youtube_comments_dump.py")
+    p_compact.add_argument("--out", default=None,
+                           help="New base path (default: today's dump path next to the base)")
+    p_compact.add_argument("--keep-deltas", action="store_true",
+                           help="Leave the folded delta files in place")
+
+    p_status = sub.add_parser("status", help="List a base dump's deltas")
+    p_status.add_argument("base", help="Base dump written by youtube_comments_dump.py")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.command == "status":
+        for path in delta_paths(args.base):
+            header = check_delta(args.base, path)
+            counts = {"insert": 0, "update": 0, "delete": 0}
+            for rec in read_delta(path)[1]:
+                counts[rec["op"]] += 1
+            print(f"{os.path.basename(path)}  {header['created']}  "
+                  f"+{counts['insert']} ~{counts['update']} -{counts['delete']}")
+        return
+
+    if args.command == "compact":
+        n = len(delta_paths(args.base))
+        try:
+            out_path, count = compact(args.base, out_path=args.out, keep_deltas=args.keep_deltas)
+        except ValueError as e:
+            raise SystemExit(str(e))
+        print(f"Folded {n} deltas; {count} comments.")
+        print("Saved to:", out_path)
+
+
+if __name__ == "__main__":
+    main()
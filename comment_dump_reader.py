@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Fast reader for text dumps written by youtube_comments_dump.py
+(save_comments_to_file / CommentDumpWriter), including older dumps with
+Windows line endings or without updated_at lines, and compressed dumps
+(decompressed into memory and parsed in-process).
+
+The dump is memory-mapped and one regex pass over the bytes finds every
+record boundary (an offset index); records are then split into columns
+without going through Python-level line loops, optionally in parallel
+chunks across processes. Results come back as column lists, an Arrow
+table (pip install pyarrow) or a pandas DataFrame.
+
+    python comment_dump_reader.py DUMP.txt --out DUMP.parquet --processes 8
+"""
+import os
+import re
+import mmap
+import argparse
+from array import array
+from contextlib import contextmanager
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+
+from comment_formats import COLUMNS, arrow_schema, require_pyarrow
+from dump_codecs import detect_codec, read_dump_bytes
+
+# --------- Config ----------
+CHUNK_RECORDS = 200000     # records per parallel work unit
+# ---------------------------
+
+SEPARATOR = b"-" * 80
+HEADER_RULE = b"=" * 80
+HEADER_KEYS = {b"Video ID": "video_id", b"Original input": "label"}
+
+
+@contextmanager
+def _open_buffer(path: str, data: bytes | None = None):
+    """
+    The dump's bytes: data if the caller already has them, else a
+    read-only mmap, or the decompressed contents of a gzip/xz/zstd dump
+    (which can't be mapped).
+    """
+    if data is not None:
+        yield data
+        return
+    if detect_codec(path):
+        yield read_dump_bytes(path)
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        yield mm
+
+
+def _newline(mm) -> bytes:
+    """
+    b"\\r\\n" for dumps written in text mode on Windows, else b"\\n".
+    """
+    end = mm.find(b"\n")
+    return b"\r\n" if end > 0 and mm[end - 1:end] == b"\r" else b"\n"
+
+
+def _record_start_re(nl: bytes):
+    # A record starts with "#N [kind]" right after the previous record's
+    # separator line and a blank line; the literal prefix lets the regex
+    # engine skip through the text at memchr speed.
+    return re.compile(re.escape(SEPARATOR + nl + nl) + rb"#\d+ \[(?:top|reply)\]" + re.escape(nl))
+
+
+@lru_cache(maxsize=None)
+def _record_re(nl: bytes):
+    # The fixed part of one record, up to the blank line before its text.
+    n = re.escape(nl)
+    return re.compile(
+        rb"#\d+ \[(top|reply)\]" + n
+        + rb"comment_id: ([^\r\n]*)" + n
+        + rb"(?:parent_id: ([^\r\n]*)" + n + rb")?"
+        + rb"author: ([^\r\n]*)" + n
+        + rb"published_at: ([^\r\n]*)" + n
+        + rb"(?:updated_at: ([^\r\n]*)" + n + rb")?"
+        + rb"likes: (-?\d+)" + n + n
+    )
+
+
+class DumpIndex:
+    """
+    Offsets of every record in a dump file.
+    offsets[i] is the byte offset of record i (0-based, i.e. "#i+1");
+    record i ends where record i+1 starts (or at `end`).
+    """
+
+    def __init__(self, path: str, offsets: array, end: int, newline: bytes, header: dict,
+                 compressed: bool = False):
+        self.path = path
+        self.compressed = compressed
+        self.offsets = offsets
+        self.end = end
+        self.newline = newline
+        self.header = header
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def span(self, i: int) -> tuple:
+        stop = self.offsets[i + 1] if i + 1 < len(self.offsets) else self.end
+        return self.offsets[i], stop
+
+
+def _parse_header(block: bytes, nl: bytes) -> dict:
+    header = {"video_id": None, "label": None, "total": None}
+    for line in block.split(nl):
+        key, _, value = line.partition(b": ")
+        if key in HEADER_KEYS:
+            header[HEADER_KEYS[key]] = value.decode("utf-8")
+        elif key.startswith(b"Total comments") and value.strip():
+            header["total"] = int(value)
+    return header
+
+
+def build_index(path: str) -> DumpIndex:
+    """
+    Memory-map path and index its record boundaries in one regex pass.
+    Offsets of a compressed dump refer to its decompressed contents.
+    """
+    with _open_buffer(path) as mm:
+        nl = _newline(mm)
+        rule = mm.find(HEADER_RULE)
+        header = _parse_header(mm[:max(rule, 0)], nl)
+        offsets = array("q")
+        first = rule + len(HEADER_RULE + nl + nl)
+        if rule >= 0 and mm[first:first + 1] == b"#":
+            offsets.append(first)
+        skip = len(SEPARATOR + nl + nl)
+        offsets.extend(m.start() + skip for m in _record_start_re(nl).finditer(mm, first))
+        return DumpIndex(path, offsets, len(mm), nl, header,
+                         compressed=not isinstance(mm, mmap.mmap))
+
+
+def parse_record(buf, start: int, stop: int, nl: bytes = b"\n") -> dict:
+    """
+    The record at buf[start:stop] (e.g. a DumpIndex.span() of an mmap) as
+    the comment dict iter_comments_from_file would yield for it.
+    """
+    m = _record_re(nl).match(buf, start, stop)
+    if m is None:
+        raise ValueError(f"Malformed record at byte {start}")
+    kind, cid, parent, author, pub, upd, like = m.groups()
+    text = bytes(buf[m.end():stop - len(nl + SEPARATOR + nl + nl)]).decode("utf-8")
+    return {
+        "comment_id": cid.decode("utf-8"),
+        "parent_id": parent.decode("utf-8") if parent else None,
+        "is_reply": kind == b"reply",
+        "author": author.decode("utf-8"),
+        "published_at": pub.decode("ascii"),
+        "updated_at": upd.decode("ascii") if upd else "",
+        "like_count": int(like),
+        "text": text.replace("\r\n", "\n") if nl == b"\r\n" else text,
+    }
+
+
+def _empty_columns() -> dict:
+    return {name: [] for name in COLUMNS if name != "video_id"}
+
+
+def _parse_span(path: str, offsets: list, end: int, nl: bytes,
+                data: bytes | None = None) -> dict:
+    """
+    Parse the records starting at `offsets` (the last one ending at
+    `end`) into column lists. Runs in worker processes.
+    data: the decompressed dump, for compressed dumps (parsed in-process).
+    """
+    record = _record_re(nl).match
+    tail = len(nl + SEPARATOR + nl + nl)
+    crlf = nl == b"\r\n"
+    kinds, ids, parents, authors, published, updated, likes, texts = ([] for _ in range(8))
+    with _open_buffer(path, data) as mm:
+        bounds = list(offsets) + [end]
+        for start, stop in zip(bounds, bounds[1:]):
+            m = record(mm, start, stop)
+            if m is None:
+                raise ValueError(f"{path}: malformed record at byte {start}")
+            kind, cid, parent, author, pub, upd, like = m.groups()
+            kinds.append(kind)
+            ids.append(cid)
+            parents.append(parent)
+            authors.append(author)
+            published.append(pub)
+            updated.append(upd)
+            likes.append(like)
+            texts.append(mm[m.end():stop - tail])
+
+    text = [t.decode("utf-8") for t in texts]
+    if crlf:
+        text = [t.replace("\r\n", "\n") for t in text]
+    return {
+        "comment_id": [x.decode("utf-8") for x in ids],
+        "parent_id": [x.decode("utf-8") if x else None for x in parents],
+        "is_reply": [k == b"reply" for k in kinds],
+        "author": [x.decode("utf-8") for x in authors],
+        "published_at": [x.decode("ascii") if x else None for x in published],
+        "updated_at": [x.decode("ascii") if x else None for x in updated],
+        "like_count": list(map(int, likes)),
+        "text": text,
+    }
+
+
+def _chunks(index: DumpIndex) -> list:
+    """
+    (path, offsets, end, newline) work units of CHUNK_RECORDS records.
+    """
+    n = len(index)
+    units = []
+    for lo in range(0, n, CHUNK_RECORDS):
+        hi = min(lo + CHUNK_RECORDS, n)
+        end = index.offsets[hi] if hi < n else index.end
+        units.append((index.path, index.offsets[lo:hi].tolist(), end, index.newline))
+    return units
+
+
+def _map_chunks(func, index: DumpIndex, processes: int | None, *extra) -> list:
+    units = _chunks(index)
+    if index.compressed:
+        # Decompress once and parse every chunk from that buffer here;
+        # workers would each have to decompress the whole file again
+        data = read_dump_bytes(index.path)
+        return [func(*unit, *extra, data) for unit in units]
+    if processes == 1 or len(units) <= 1:
+        return [func(*unit, *extra) for unit in units]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(func, *unit, *extra) for unit in units]
+        return [fut.result() for fut in futures]
+
+
+def read_columns(path: str, processes: int | None = 1, index: DumpIndex | None = None):
+    """
+    Parse a dump into column lists (timestamps still ISO strings).
+    processes > 1 (or None for os.cpu_count()) parses CHUNK_RECORDS-sized
+    chunks in a process pool. Returns (columns dict, DumpIndex).
+    """
+    index = index or build_index(path)
+    cols = _empty_columns()
+    for part in _map_chunks(_parse_span, index, processes):
+        for name, values in part.items():
+            cols[name].extend(values)
+    cols["video_id"] = [index.header["video_id"]] * len(index)
+    return cols, index
+
+
+def _arrow_span(path: str, offsets: list, end: int, nl: bytes, video_id: str | None,
+                data: bytes | None = None):
+    """
+    _parse_span as a pyarrow Table; Arrow buffers travel back from worker
+    processes far cheaper than pickled lists of str.
+    """
+    pa = require_pyarrow()
+    import pyarrow.compute as pc
+
+    cols = _parse_span(path, offsets, end, nl, data)
+    cols["video_id"] = [video_id] * len(cols["comment_id"])
+    schema = arrow_schema()
+    arrays = []
+    for field in schema:
+        values = cols[field.name]
+        if pa.types.is_timestamp(field.type):
+            values = pc.strptime(pa.array(values, pa.string()),
+                                 format="%Y-%m-%dT%H:%M:%SZ", unit="s").cast(field.type)
+        arrays.append(pa.array(values, field.type))
+    return pa.table(arrays, schema=schema)
+
+
+def to_arrow(path: str, processes: int | None = 1, index: DumpIndex | None = None):
+    """
+    Parse a dump into a pyarrow Table with comment_formats.arrow_schema().
+    """
+    pa = require_pyarrow()
+    index = index or build_index(path)
+    tables = _map_chunks(_arrow_span, index, processes, index.header["video_id"])
+    if not tables:
+        return arrow_schema().empty_table()
+    return pa.concat_tables(tables)
+
+
+def to_dataframe(path: str, processes: int | None = 1):
+    """
+    Parse a dump into a pandas DataFrame (typed like the Arrow schema).
+    """
+    import pandas as pd
+
+    cols, _ = read_columns(path, processes=processes)
+    df = pd.DataFrame({name: cols[name] for name in COLUMNS})
+    for name in ("published_at", "updated_at"):
+        df[name] = pd.to_datetime(df[name], utc=True, format="ISO8601")
+    df["like_count"] = df["like_count"].astype("int64")
+    df["is_reply"] = df["is_reply"].astype(bool)
+    return df
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Convert a text comment dump to Parquet or Arrow."
+    )
+    parser.add_argument("dump", help="Dump file written by youtube_comments_dump.py")
+    parser.add_argument("--out", required=True,
+                        help="Output file; format from the extension (.parquet or .arrow)")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="Parser processes (default: all CPUs; 1 = in-process)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    table = to_arrow(args.dump, processes=args.processes)
+    ext = os.path.splitext(args.out)[1].lower()
+    if ext == ".parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, args.out, compression="zstd")
+    elif ext == ".arrow":
+        pa = require_pyarrow()
+        with pa.ipc.new_file(args.out, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        raise SystemExit(f"Unknown output extension: {ext!r}")
+    print(f"{table.num_rows} comments -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
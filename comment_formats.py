@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Machine-readable output formats for youtube_comments_dump: JSON Lines,
+Parquet and Arrow IPC.
+
+The writers have the same write/write_many/close interface as
+CommentDumpWriter and stream to disk: JSON Lines per comment, Parquet
+and Arrow one row group / record batch of ROW_GROUP_SIZE comments at a
+time. Columns follow the comment-dict schema with real types (int64
+likes, UTC timestamps, boolean is_reply) plus the video_id.
+Parquet and Arrow need pyarrow (pip install pyarrow); JSON Lines does not.
+"""
+import json
+from datetime import datetime
+
+# --------- Config ----------
+ROW_GROUP_SIZE = 65536     # comments per Parquet row group / Arrow batch
+PARQUET_COMPRESSION = "zstd"
+# ---------------------------
+
+COLUMNS = ("video_id", "comment_id", "parent_id", "is_reply", "author",
+           "published_at", "updated_at", "like_count", "text")
+
+
+def require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise RuntimeError(
+            "The parquet and arrow formats need pyarrow: pip install pyarrow"
+        ) from None
+    return pyarrow
+
+
+def arrow_schema():
+    """
+    Arrow schema of the columnar formats.
+    """
+    pa = require_pyarrow()
+    return pa.schema([
+        ("video_id", pa.string()),
+        ("comment_id", pa.string()),
+        ("parent_id", pa.string()),
+        ("is_reply", pa.bool_()),
+        ("author", pa.string()),
+        ("published_at", pa.timestamp("s", tz="UTC")),
+        ("updated_at", pa.timestamp("s", tz="UTC")),
+        ("like_count", pa.int64()),
+        ("text", pa.string()),
+    ])
+
+
+def parse_timestamp(s: str) -> datetime | None:
+    """
+    "2024-01-31T12:00:00Z" -> aware datetime ("" -> None).
+    """
+    # fromisoformat only accepts the "Z" suffix from Python 3.11 on
+    return datetime.fromisoformat(s.replace("Z", "+00:00")) if s else None
+
+
+class _StreamingWriter:
+    """
+    Shared bookkeeping for the writers below.
+    A comment dict may carry its own "video_id" (channel mode); otherwise
+    the writer's video_id is used.
+    """
+
+    def __init__(self, fpath: str, video_id: str | None = None):
+        self.fpath = fpath
+        self.video_id = video_id
+        self.count = 0
+
+    def write_many(self, comments):
+        for c in comments:
+            self.write(c)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class JsonlCommentWriter(_StreamingWriter):
+    """
+    One JSON object per line, timestamps kept as the API's ISO strings.
+    """
+
+    def __init__(self, fpath: str, video_id: str | None = None):
+        super().__init__(fpath, video_id)
+        self._f = open(fpath, "w", encoding="utf-8", newline="\n")
+
+    def write(self, c: dict):
+        row = {
+            "video_id": c.get("video_id") or self.video_id,
+            "comment_id": c["comment_id"],
+            "parent_id": c["parent_id"],
+            "is_reply": bool(c["is_reply"]),
+            "author": c["author"],
+            "published_at": c["published_at"] or None,
+            "updated_at": c["updated_at"] or None,
+            "like_count": int(c["like_count"]),
+            "text": c["text"],
+        }
+        self._f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def close(self) -> int:
+        if not self._f.closed:
+            self._f.close()
+        return self.count
+
+
+class ArrowCommentWriter(_StreamingWriter):
+    """
+    Parquet (fmt="parquet") or Arrow IPC file (fmt="arrow") writer.
+    Comments are buffered column-wise and flushed every row_group_size
+    rows, so memory use is bounded by one row group.
+    """
+
+    def __init__(self, fpath: str, video_id: str | None = None, fmt: str = "parquet",
+                 row_group_size: int | None = None):
+        super().__init__(fpath, video_id)
+        self._pa = require_pyarrow()
+        self.schema = arrow_schema()
+        self.row_group_size = row_group_size or ROW_GROUP_SIZE
+        self._columns = {name: [] for name in COLUMNS}
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(fpath, self.schema, compression=PARQUET_COMPRESSION)
+        elif fmt == "arrow":
+            self._writer = self._pa.ipc.new_file(fpath, self.schema)
+        else:
+            raise ValueError(f"Unknown columnar format: {fmt!r}")
+
+    def write(self, c: dict):
+        cols = self._columns
+        cols["video_id"].append(c.get("video_id") or self.video_id)
+        cols["comment_id"].append(c["comment_id"])
+        cols["parent_id"].append(c["parent_id"])
+        cols["is_reply"].append(bool(c["is_reply"]))
+        cols["author"].append(c["author"])
+        cols["published_at"].append(parse_timestamp(c["published_at"]))
+        cols["updated_at"].append(parse_timestamp(c["updated_at"]))
+        cols["like_count"].append(int(c["like_count"]))
+        cols["text"].append(c["text"])
+        self.count += 1
+        if len(cols["comment_id"]) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if not self._columns["comment_id"]:
+            return
+        batch = self._pa.RecordBatch.from_pydict(self._columns, schema=self.schema)
+        self._writer.write_batch(batch)
+        self._columns = {name: [] for name in COLUMNS}
+
+    def close(self) -> int:
+        if self._writer is not None:
+            self.flush()
+            self._writer.close()
+            self._writer = None
+        return self.count
+
+
+def open_format_writer(fmt: str, fpath: str, video_id: str | None = None):
+    """
+    Writer for fmt ("jsonl", "parquet" or "arrow") at fpath.
+    """
+    if fmt == "jsonl":
+        return JsonlCommentWriter(fpath, video_id)
+    return ArrowCommentWriter(fpath, video_id, fmt=fmt)
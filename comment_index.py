@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Random-access index sidecars for text comment dumps.
+
+CommentDumpWriter writes <dump>.idx next to every dump it completes: the
+byte offset of each record plus a table of comment_id hashes sorted for
+binary search. DumpLookup memory-maps both files, so fetching comment #N
+or a given comment_id is a couple of seeks however big the dump is.
+
+    python comment_index.py build DUMP.txt [...]      # index older dumps
+    python comment_index.py get DUMP.txt --n 12345
+    python comment_index.py get DUMP.txt --id UgxABC...
+    python comment_index.py get DUMP.manifest.json --n 12345   # sharded dump
+
+Sidecar layout (little-endian):
+    header   magic, record count, dump size, newline length  (HEADER)
+    offsets  count + 1 uint64: start of each record, then the end of the last
+    keys     count (uint64 hash, uint64 record index) pairs, sorted by hash
+"""
+import os
+import re
+import sys
+import json
+import mmap
+import struct
+import argparse
+from array import array
+from bisect import bisect_left
+from hashlib import blake2b
+
+from comment_dump_reader import build_index, parse_record
+from dump_codecs import detect_codec
+
+# --------- Config ----------
+INDEX_SUFFIX = ".idx"
+# ---------------------------
+
+MAGIC = b"YTCIDX\x00\x01"
+HEADER = struct.Struct("<8sQQB7x")
+U64 = struct.Struct("<Q")
+KEY = struct.Struct("<QQ")
+RECORD_NUMBER_RE = re.compile(rb"#(\d+) \[")
+
+
+class StaleIndexError(RuntimeError):
+    pass
+
+
+def index_path(dump_path: str) -> str:
+    """
+    Sidecar index path for the dump file dump_path.
+    """
+    return dump_path + INDEX_SUFFIX
+
+
+def key_hash(comment_id: str) -> int:
+    return int.from_bytes(blake2b(comment_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _le_bytes(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class IndexBuilder:
+    """
+    Collects (offset, comment_id) pairs while a dump is written, then
+    saves the sidecar once the dump is complete.
+    """
+
+    def __init__(self):
+        self.offsets = array("Q")
+        self.hashes = array("Q")
+
+    def add(self, offset: int, comment_id: str):
+        self.offsets.append(offset)
+        self.hashes.append(key_hash(comment_id))
+
+    def save(self, dump_path: str, end: int, newline: bytes = b"\n") -> str:
+        """
+        Atomically write the sidecar for dump_path, whose last record ends
+        at byte `end` (the file size). Returns the sidecar path.
+        """
+        count = len(self.offsets)
+        keys = sorted(zip(self.hashes, range(count)))
+        path = index_path(dump_path)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, count, end, len(newline)))
+            offsets = array("Q", self.offsets)
+            offsets.append(end)
+            f.write(_le_bytes(offsets))
+            f.write(_le_bytes(array("Q", (v for key in keys for v in key))))
+        os.replace(tmp, path)
+        return path
+
+
+def write_dump_index(dump_path: str) -> str:
+    """
+    Build the sidecar for an existing dump (older dumps, or ones whose
+    writer was resumed) by scanning it. Returns the sidecar path.
+    Compressed dumps can't be indexed (there is nothing to seek into).
+    """
+    if detect_codec(dump_path):
+        raise ValueError(f"{dump_path} is compressed; only plain dumps can be indexed.")
+    index = build_index(dump_path)
+    nl = re.escape(index.newline)
+    comment_id = re.compile(rb"#\d+ \[\w+\]" + nl + rb"comment_id: ([^\r\n]*)" + nl)
+    builder = IndexBuilder()
+    with open(dump_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for offset in index.offsets:
+            builder.add(offset, comment_id.match(mm, offset).group(1).decode("utf-8"))
+    return builder.save(dump_path, index.end, index.newline)
+
+
+class _HashColumn:
+    """
+    The sorted hashes of a sidecar as a sequence, for bisect.
+    """
+
+    def __init__(self, mm, base: int, count: int):
+        self._mm = mm
+        self._base = base
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i: int) -> int:
+        return U64.unpack_from(self._mm, self._base + i * KEY.size)[0]
+
+
+class DumpLookup:
+    """
+    Random access to the records of a dump through its sidecar index.
+        lookup[n]              -> comment dict of record n (0-based; shown
+                                  as "#first_number+n")
+        lookup.find(cid)       -> comment dict for comment_id cid, or None
+        lookup.position(cid)   -> record number of cid, or None
+    Raises StaleIndexError if the dump changed size since it was indexed
+    (rebuild with write_dump_index).
+    """
+
+    def __init__(self, dump_path: str, sidecar: str | None = None):
+        self.path = dump_path
+        self._files = [open(dump_path, "rb"), open(sidecar or index_path(dump_path), "rb")]
+        self._dump = mmap.mmap(self._files[0].fileno(), 0, access=mmap.ACCESS_READ)
+        self._idx = mmap.mmap(self._files[1].fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, size, nl_len = HEADER.unpack_from(self._idx, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{self._files[1].name} is not a comment dump index.")
+        if size != len(self._dump):
+            self.close()
+            raise StaleIndexError(f"{dump_path} changed since it was indexed; rebuild the index.")
+        self.newline = b"\r\n" if nl_len == 2 else b"\n"
+        self._offsets_at = HEADER.size
+        self._keys_at = HEADER.size + (self.count + 1) * U64.size
+        self._hashes = _HashColumn(self._idx, self._keys_at, self.count)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def first_number(self) -> int:
+        """
+        The "#N" of the first record: 1, or where the numbering continues
+        for the later shards of a sharded dump.
+        """
+        if not self.count:
+            return 1
+        m = RECORD_NUMBER_RE.match(self._dump, *self.span(0))
+        return int(m.group(1)) if m else 1
+
+    def span(self, n: int) -> tuple:
+        """
+        (start, stop) byte offsets of record n in the dump.
+        """
+        if not 0 <= n < self.count:
+            raise IndexError(f"record {n} out of range (dump has {self.count})")
+        return struct.unpack_from("<QQ", self._idx, self._offsets_at + n * U64.size)
+
+    def __getitem__(self, n: int) -> dict:
+        if n < 0:
+            n += self.count
+        start, stop = self.span(n)
+        return parse_record(self._dump, start, stop, self.newline)
+
+    def position(self, comment_id: str) -> int | None:
+        h = key_hash(comment_id)
+        i = bisect_left(self._hashes, h)
+        # Equal hashes sit next to each other; confirm against the record
+        while i < self.count:
+            key, n = KEY.unpack_from(self._idx, self._keys_at + i * KEY.size)
+            if key != h:
+                break
+            start, stop = self.span(n)
+            if parse_record(self._dump, start, stop, self.newline)["comment_id"] == comment_id:
+                return n
+            i += 1
+        return None
+
+    def find(self, comment_id: str) -> dict | None:
+        n = self.position(comment_id)
+        return None if n is None else self[n]
+
+    def close(self):
+        for mm in (getattr(self, "_dump", None), getattr(self, "_idx", None)):
+            if mm is not None:
+                mm.close()
+        for f in self._files:
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def dump_files(path: str) -> list:
+    """
+    The dump files behind path: the shards listed by a sharded dump's
+    manifest (<dump>.manifest.json), otherwise path itself.
+    """
+    if not path.endswith(".manifest.json"):
+        return [path]
+    with open(path, encoding="utf-8") as f:
+        shards = json.load(f)["shards"]
+    base = os.path.dirname(os.path.abspath(path))
+    return [os.path.join(base, shard["path"]) for shard in shards]
+
+
+def get_comment(path: str, number: int | None = None, comment_id: str | None = None):
+    """
+    (number as shown in the dump, comment dict) of record "#number" or of
+    comment_id in the dump or sharded dump (manifest) at path, building
+    missing sidecars; None if there is no such record.
+    """
+    if number is not None and number < 1:
+        raise ValueError(f"Record numbers start at 1, not {number}.")
+    for dump in dump_files(path):
+        if not os.path.exists(index_path(dump)):
+            write_dump_index(dump)
+        with DumpLookup(dump) as lookup:
+            first = lookup.first_number
+            if comment_id is not None:
+                n = lookup.position(comment_id)
+            else:
+                n = number - first if first <= number < first + len(lookup) else None
+            if n is not None:
+                return first + n, lookup[n]
+    return None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build or query comment dump index sidecars.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_build = sub.add_parser("build", help="Write the .idx sidecar for existing dumps")
+    p_build.add_argument("dumps", nargs="+", help="Dump files written by youtube_comments_dump.py")
+
+    p_get = sub.add_parser("get", help="Print one comment from a dump")
+    p_get.add_argument("dump", help="Dump file, or the .manifest.json of a sharded dump")
+    group = p_get.add_mutually_exclusive_group(required=True)
+    group.add_argument("--n", type=int, help="Record number as shown in the dump (#N)")
+    group.add_argument("--id", help="comment_id")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.command == "build":
+        for dump in args.dumps:
+            print(f"indexed: {write_dump_index(dump)}")
+        return
+
+    try:
+        found = get_comment(args.dump, number=args.n, comment_id=args.id)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    if found is None:
+        what = f"comment {args.id!r}" if args.id is not None else f"record #{args.n}"
+        raise SystemExit(f"No {what} in {args.dump}")
+    number, c = found
+    print(f"#{number} [{'reply' if c['is_reply'] else 'top'}] {c['comment_id']}")
+    for key in ("parent_id", "author", "published_at", "updated_at", "like_count"):
+        if c[key] is not None:
+            print(f"{key}: {c[key]}")
+    print()
+    print(c["text"])
+
+
+if __name__ == "__main__":
+    main()
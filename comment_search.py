@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Full-text search over comment dumps.
+
+    python comment_search.py index DUMP_OR_DIR [...]   # add/refresh dumps
+    python comment_search.py search "some phrase"      # bm25-ranked hits
+
+Dumps written by youtube_comments_dump.py are ingested into an SQLite
+FTS5 index. Indexing is incremental: files whose size and mtime have not
+changed since they were last indexed are skipped, and comments are
+upserted by comment_id, so re-indexing a refreshed dump only touches the
+rows that changed. Each row remembers the dump it was last read from
+(source), and comments no longer in a re-indexed dump are deleted.
+Merging the FTS segments rewrites the whole index, so it is only done
+on request (index --optimize), e.g. after a large import.
+"""
+import os
+import glob
+import sqlite3
+import argparse
+
+from youtube_comments_dump import iter_comments_from_file, read_dump_header
+
+# --------- Config ----------
+DEFAULT_INDEX = "youtube_comments_fts.sqlite3"
+BATCH_SIZE = 5000          # rows per transaction while indexing
+DUMP_GLOBS = ("YouTube_comments_for_video_*.txt", "YouTube_comments_for_video_*.txt.gz",
+              "YouTube_comments_for_video_*.txt.xz", "YouTube_comments_for_video_*.txt.zst")
+# ---------------------------
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    rowid        INTEGER PRIMARY KEY,
+    comment_id   TEXT NOT NULL UNIQUE,
+    video_id     TEXT,
+    parent_id    TEXT,
+    author       TEXT,
+    published_at TEXT,
+    like_count   INTEGER,
+    text         TEXT,
+    source       TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS comments_fts USING fts5(
+    text, author, content='docs', content_rowid='rowid'
+);
+-- Keep the external-content FTS table in step with docs
+CREATE TRIGGER IF NOT EXISTS docs_ai AFTER INSERT ON docs BEGIN
+    INSERT INTO comments_fts (rowid, text, author) VALUES (new.rowid, new.text, new.author);
+END;
+CREATE TRIGGER IF NOT EXISTS docs_ad AFTER DELETE ON docs BEGIN
+    INSERT INTO comments_fts (comments_fts, rowid, text, author)
+    VALUES ('delete', old.rowid, old.text, old.author);
+END;
+CREATE TRIGGER IF NOT EXISTS docs_au AFTER UPDATE ON docs BEGIN
+    INSERT INTO comments_fts (comments_fts, rowid, text, author)
+    VALUES ('delete', old.rowid, old.text, old.author);
+    INSERT INTO comments_fts (rowid, text, author) VALUES (new.rowid, new.text, new.author);
+END;
+CREATE TABLE IF NOT EXISTS indexed_files (
+    path     TEXT PRIMARY KEY,
+    size     INTEGER,
+    mtime_ns INTEGER
+);
+"""
+
+UPSERT = """
+INSERT INTO docs (comment_id, video_id, parent_id, author, published_at, like_count, text,
+                  source)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (comment_id) DO UPDATE SET
+    video_id = excluded.video_id,
+    parent_id = excluded.parent_id,
+    author = excluded.author,
+    published_at = excluded.published_at,
+    like_count = excluded.like_count,
+    text = excluded.text,
+    source = excluded.source
+WHERE docs.text IS NOT excluded.text
+   OR docs.author IS NOT excluded.author
+   OR docs.like_count IS NOT excluded.like_count
+   OR docs.source IS NOT excluded.source
+"""
+
+# Rows of a re-indexed dump that are no longer in it
+DELETE_GONE = """
+DELETE FROM docs
+WHERE source = ? AND comment_id NOT IN (SELECT comment_id FROM temp.seen)
+"""
+
+SEARCH = """
+SELECT docs.video_id, docs.author, docs.like_count, docs.comment_id,
+       snippet(comments_fts, 0, '[', ']', '...', 16), bm25(comments_fts)
+FROM comments_fts
+JOIN docs ON docs.rowid = comments_fts.rowid
+WHERE comments_fts MATCH ? {video_filter}
+ORDER BY bm25(comments_fts)
+LIMIT ?
+"""
+
+
+def connect(index_path: str) -> sqlite3.Connection:
+    """
+    Open (creating if needed) a search index.
+    """
+    conn = sqlite3.connect(index_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    # Indexes created before rows tracked their dump
+    if "source" not in {row[1] for row in conn.execute("PRAGMA table_info(docs)")}:
+        conn.execute("ALTER TABLE docs ADD COLUMN source TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS docs_source ON docs (source)")
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen (comment_id TEXT PRIMARY KEY)")
+    return conn
+
+
+def expand_dump_paths(paths) -> list:
+    """
+    Dump files named directly, plus every DUMP_GLOBS file (plain or
+    compressed) in named directories.
+    """
+    found = []
+    for p in paths:
+        if os.path.isdir(p):
+            found.extend(sorted(
+                path for pattern in DUMP_GLOBS
+                for path in glob.glob(os.path.join(glob.escape(p), pattern))
+            ))
+        else:
+            found.append(p)
+    return found
+
+
+def index_dump(conn: sqlite3.Connection, fpath: str, force: bool = False) -> int | None:
+    """
+    Add one text dump to the index, deleting the rows last read from it
+    that it no longer contains. Returns the number of comments read, or
+    None if the file is unchanged since it was last indexed.
+    """
+    path = os.path.abspath(fpath)
+    st = os.stat(path)
+    row = conn.execute("SELECT size, mtime_ns FROM indexed_files WHERE path = ?", (path,)).fetchone()
+    if not force and row == (st.st_size, st.st_mtime_ns):
+        return None
+
+    video_id = read_dump_header(path)["video_id"]
+    count = 0
+    rows = []
+    with conn:
+        conn.execute("DELETE FROM temp.seen")
+    for c in iter_comments_from_file(path):
+        rows.append((c["comment_id"], video_id, c["parent_id"], c["author"],
+                     c["published_at"], c["like_count"], c["text"], path))
+        if len(rows) >= BATCH_SIZE:
+            with conn:
+                conn.executemany(UPSERT, rows)
+                conn.executemany("INSERT OR IGNORE INTO temp.seen VALUES (?)",
+                                 ((r[0],) for r in rows))
+            count += len(rows)
+            rows = []
+    with conn:
+        conn.executemany(UPSERT, rows)
+        conn.executemany("INSERT OR IGNORE INTO temp.seen VALUES (?)", ((r[0],) for r in rows))
+        conn.execute(DELETE_GONE, (path,))
+        conn.execute("DELETE FROM temp.seen")
+        conn.execute(
+            "INSERT OR REPLACE INTO indexed_files (path, size, mtime_ns) VALUES (?, ?, ?)",
+            (path, st.st_size, st.st_mtime_ns),
+        )
+    return count + len(rows)
+
+
+def search(conn: sqlite3.Connection, query: str, limit: int = 20, video_id: str | None = None):
+    """
+    bm25-ranked matches for an FTS5 query (words, "phrases", AND/OR/NOT,
+    prefix*). Returns a list of (video_id, author, like_count, comment_id,
+    snippet, score) tuples, best first. ValueError for a query FTS5
+    can't parse.
+    """
+    params = [query]
+    video_filter = ""
+    if video_id:
+        video_filter = "AND docs.video_id = ?"
+        params.append(video_id)
+    params.append(limit)
+    try:
+        return conn.execute(SEARCH.format(video_filter=video_filter), params).fetchall()
+    except sqlite3.OperationalError as e:
+        # e.g. foo-bar is read as column filter "bar": quote it, "foo-bar"
+        raise ValueError(f"Query syntax error in {query!r}: {e} "
+                         '(put terms with punctuation in double quotes, e.g. "foo-bar")') from e
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Full-text search over YouTube comment dumps.")
+    parser.add_argument("--index", default=DEFAULT_INDEX,
+                        help=f"Search index database (default: {DEFAULT_INDEX})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_index = sub.add_parser("index", help="Add or refresh dumps in the index")
+    p_index.add_argument("paths", nargs="+", help="Dump files or directories containing dumps")
+    p_index.add_argument("--force", action="store_true",
+                         help="Re-read files even if they look unchanged")
+    p_index.add_argument("--optimize", action="store_true",
+                         help="Merge the FTS segments afterwards (rewrites the whole index)")
+
+    p_search = sub.add_parser("search", help="Search indexed comments")
+    p_search.add_argument("query", help='FTS5 query, e.g. great OR "very good"')
+    p_search.add_argument("--limit", type=int, default=20, help="Maximum results (default: 20)")
+    p_search.add_argument("--video", default=None, help="Only search this video ID")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    conn = connect(args.index)
+
+    if args.command == "index":
+        for path in expand_dump_paths(args.paths):
+            count = index_dump(conn, path, force=args.force)
+            if count is None:
+                print(f"unchanged: {path}")
+            else:
+                print(f"indexed {count} comments: {path}")
+        if args.optimize:
+            # Merge FTS segments so later searches stay fast
+            with conn:
+                conn.execute("INSERT INTO comments_fts (comments_fts) VALUES ('optimize')")
+    else:
+        try:
+            hits = search(conn, args.query, limit=args.limit, video_id=args.video)
+        except ValueError as e:
+            conn.close()
+            raise SystemExit(str(e))
+        for video_id, author, likes, comment_id, snippet, score in hits:
+            print(f"{score:8.2f}  {video_id}  {author} ({likes} likes)  {comment_id}")
+            print(f"          {' '.join(snippet.split())}")
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
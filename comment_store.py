@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+SQLite backend for youtube_comments_dump.
+
+Comments are stored one row per comment_id with upsert semantics, so
+dumping a video again merges into what is already there. Writes are
+batched into transactions with executemany.
+"""
+import os
+import sqlite3
+
+# --------- Config ----------
+DEFAULT_DB_NAME = "youtube_comments.sqlite3"
+BATCH_SIZE = 1000          # rows per transaction
+BUSY_TIMEOUT_MS = 30000    # wait this long for other writers (batch mode)
+# ---------------------------
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS comments (
+    comment_id   TEXT PRIMARY KEY,
+    video_id     TEXT NOT NULL,
+    parent_id    TEXT,
+    is_reply     INTEGER NOT NULL,
+    author       TEXT,
+    published_at TEXT,
+    updated_at   TEXT,
+    like_count   INTEGER,
+    text         TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_comments_video_published ON comments (video_id, published_at);
+CREATE INDEX IF NOT EXISTS idx_comments_parent ON comments (parent_id);
+CREATE INDEX IF NOT EXISTS idx_comments_author ON comments (author);
+"""
+
+UPSERT = """
+INSERT INTO comments (comment_id, video_id, parent_id, is_reply, author,
+                      published_at, updated_at, like_count, text)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (comment_id) DO UPDATE SET
+    video_id     = excluded.video_id,
+    parent_id    = excluded.parent_id,
+    is_reply     = excluded.is_reply,
+    author       = excluded.author,
+    published_at = excluded.published_at,
+    updated_at   = excluded.updated_at,
+    like_count   = excluded.like_count,
+    text         = excluded.text
+"""
+
+
+def default_db_path(out_dir: str | None = None) -> str:
+    """
+    DEFAULT_DB_NAME in out_dir (default: current working directory).
+    """
+    if out_dir is None:
+        out_dir = os.getcwd()
+    os.makedirs(out_dir, exist_ok=True)
+    return os.path.join(out_dir, DEFAULT_DB_NAME)
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """
+    Open (creating if needed) a comment database with its schema and indexes.
+    """
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class SQLiteCommentWriter:
+    """
+    Drop-in for CommentDumpWriter that upserts comments into a SQLite
+    database instead of writing a text dump. Rows are buffered and
+    written BATCH_SIZE at a time in one transaction.
+    A comment dict may carry its own "video_id" (channel mode); otherwise
+    the writer's video_id is used.
+    """
+
+    def __init__(self, db_path: str, video_id: str | None = None, batch_size: int = BATCH_SIZE):
+        self.fpath = db_path
+        self.video_id = video_id
+        self.batch_size = batch_size
+        self.count = 0
+        self._rows = []
+        self._conn = connect(db_path)
+
+    def write(self, c: dict):
+        self._rows.append((
+            c["comment_id"],
+            c.get("video_id") or self.video_id,
+            c["parent_id"],
+            int(c["is_reply"]),
+            c["author"],
+            c["published_at"],
+            c["updated_at"],
+            int(c["like_count"]),
+            c["text"],
+        ))
+        self.count += 1
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def write_many(self, comments):
+        for c in comments:
+            self.write(c)
+
+    def flush(self):
+        if not self._rows:
+            return
+        with self._conn:
+            self._conn.executemany(UPSERT, self._rows)
+        self._rows = []
+
+    def close(self) -> int:
+        """
+        Write any buffered rows, close the database and return the number
+        of comments written.
+        """
+        if self._conn is not None:
+            self.flush()
+            self._conn.close()
+            self._conn = None
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Transparent compression for comment dump files.
+
+Writers pick a codec explicitly; readers detect it from the file's magic
+bytes, so every function that reads a dump accepts plain, gzip, xz and
+zstd files alike. gzip and xz come with Python; zstd needs Python 3.14's
+compression.zstd or the zstandard package (pip install zstandard).
+"""
+import io
+import gzip
+import lzma
+
+# --------- Config ----------
+DEFAULT_LEVELS = {"gzip": 6, "xz": 6, "zstd": 3}
+BUFFER_SIZE = 1 << 20      # bytes buffered ahead of the compressor
+# ---------------------------
+
+CODECS = {"gzip": ".gz", "xz": ".xz", "zstd": ".zst"}
+MAGIC = {
+    b"\x1f\x8b": "gzip",
+    b"\xfd7zXZ\x00": "xz",
+    b"\x28\xb5\x2f\xfd": "zstd",
+}
+
+
+def configure(buffer_size: int | None = None):
+    """
+    Set the default write buffer size (e.g. from command-line options).
+    """
+    global BUFFER_SIZE
+    if buffer_size is not None:
+        BUFFER_SIZE = max(1, buffer_size)
+
+
+def _zstd():
+    try:
+        from compression import zstd   # Python 3.14+
+        return zstd
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError(
+            "zstd compression needs Python 3.14+ or the zstandard package: pip install zstandard"
+        ) from None
+    return zstandard
+
+
+def available_codecs() -> list:
+    """
+    Codecs usable here (zstd only if a zstd module is installed).
+    """
+    codecs = ["gzip", "xz"]
+    try:
+        _zstd()
+        codecs.append("zstd")
+    except RuntimeError:
+        pass
+    return codecs
+
+
+def detect_codec(path: str) -> str | None:
+    """
+    "gzip", "xz" or "zstd" from the file's magic bytes; None if uncompressed.
+    """
+    with open(path, "rb") as f:
+        head = f.read(6)
+    for magic, codec in MAGIC.items():
+        if head.startswith(magic):
+            return codec
+    return None
+
+
+def open_compressed_writer(path: str, codec: str, level: int | None = None,
+                           buffer_size: int | None = None):
+    """
+    Binary, write-only file object compressing to path with codec.
+    Writes are collected in a buffer_size buffer so the compressor sees
+    large blocks rather than one call per comment.
+    """
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec {codec!r} (choose from {', '.join(CODECS)}).")
+    if level is None:
+        level = DEFAULT_LEVELS[codec]
+    buffer_size = buffer_size or BUFFER_SIZE
+    raw = open(path, "wb", buffering=buffer_size)
+    try:
+        if codec == "gzip":
+            stream = gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=level, mtime=0)
+        elif codec == "xz":
+            stream = lzma.LZMAFile(raw, "wb", preset=level)
+        else:
+            zstd = _zstd()
+            if hasattr(zstd, "ZstdFile"):
+                stream = zstd.ZstdFile(raw, "wb", level=level)
+            else:
+                stream = zstd.ZstdCompressor(level=level).stream_writer(raw, closefd=True)
+    except BaseException:
+        raw.close()
+        raise
+    return _ClosingWriter(stream, raw, buffer_size)
+
+
+class _ClosingWriter(io.BufferedWriter):
+    """
+    BufferedWriter over a compressor stream that also closes the
+    underlying file (GzipFile/LZMAFile leave a passed-in file open).
+    """
+
+    def __init__(self, stream, raw, buffer_size: int):
+        super().__init__(_RawAdapter(stream), buffer_size=buffer_size)
+        self._stream = stream
+        self._raw_file = raw
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            super().close()
+            self._stream.close()
+        finally:
+            self._raw_file.close()
+
+
+class _RawAdapter(io.RawIOBase):
+    def __init__(self, stream):
+        self._stream = stream
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._stream.write(b)
+        return len(b)
+
+    def close(self):
+        # The owning _ClosingWriter closes the stream itself
+        io.RawIOBase.close(self)
+
+
+def open_dump_binary(path: str):
+    """
+    Binary read-only file object with the decompressed contents of path.
+    """
+    codec = detect_codec(path)
+    if codec is None:
+        return open(path, "rb")
+    if codec == "gzip":
+        return gzip.open(path, "rb")
+    if codec == "xz":
+        return lzma.open(path, "rb")
+    zstd = _zstd()
+    if hasattr(zstd, "ZstdFile"):
+        return zstd.ZstdFile(path, "rb")
+    return zstd.open(path, "rb")
+
+
+def open_dump_text(path: str):
+    """
+    open(path, encoding="utf-8") for plain or compressed dumps
+    (universal newlines, like the plain-file readers always used).
+    """
+    return io.TextIOWrapper(open_dump_binary(path), encoding="utf-8")
+
+
+def read_dump_bytes(path: str) -> bytes:
+    """
+    The whole decompressed contents of path.
+    """
+    with open_dump_binary(path) as f:
+        return f.read()
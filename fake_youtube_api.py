@@ -0,0 +1,541 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the parts of the YouTube Data API v3 these scripts
+use: commentThreads, comments, search and videos.
+
+Responses are generated from a fixture (synthetic, or recorded from the
+live API with the "record" command) with the API's pagination rules,
+partial responses (fields=), optional latency and randomly injected
+403 rateLimitExceeded / 429 errors. Point the scripts at it with
+YOUTUBE_API_BASE:
+
+    python fake_youtube_api.py serve --videos 5 --threads 2000 --latency 0.05 --error-429 0.01
+    YOUTUBE_API_BASE=http://127.0.0.1:8765/youtube/v3 YOUTUBE_API_KEY=x python youtube_comments_dump.py VIDEO_ID
+
+Fixture JSON:
+    {"channel_id": "...",
+     "videos": {video_id: {"title", "channel_id", "view_count", "like_count",
+                           "threads": [[top comment dict, reply dict, ...], ...]}},
+     "searches": {query: [video_id, ...]}}
+Comment dicts are the ones youtube_comments_dump builds (comment_from_snippet).
+"""
+import json
+import time
+import zlib
+import base64
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qsl
+
+# --------- Config ----------
+DEFAULT_PORT = 8765
+API_PATH = "/youtube/v3"
+INLINE_REPLIES = 5         # replies embedded in a commentThreads item
+MAX_PAGE = {"commentThreads": 100, "comments": 100, "search": 50, "videos": 50}
+# ---------------------------
+
+
+# ----- Fixtures -----
+
+def synthetic_fixture(videos: int = 3, threads: int = 250, reply_every: int = 3,
+                      replies: int = 7, channel_id: str = "UCfakechannel0000000000",
+                      seed: int = 0) -> dict:
+    """
+    A fixture of `videos` videos with `threads` comment threads each;
+    every reply_every-th thread has `replies` replies.
+    """
+    rng = random.Random(seed)
+    start = 1704067200  # 2024-01-01T00:00:00Z
+
+    def stamp(t):
+        return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(t))
+
+    fixture = {"channel_id": channel_id, "videos": {}, "searches": {}}
+    for v in range(videos):
+        video_id = f"fake{v:07d}"
+        video_threads = []
+        for i in range(threads):
+            top_id = f"Ug{video_id}{i:08d}"
+            published = start + i * 60
+            top = {
+                "comment_id": top_id, "parent_id": None, "is_reply": False,
+                "author": f"@author{rng.randrange(threads)}",
+                "published_at": stamp(published), "updated_at": stamp(published),
+                "like_count": int(rng.paretovariate(1.2)) - 1,
+                "text": " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 60))),
+            }
+            thread = [top]
+            for j in range(replies if reply_every and i % reply_every == 0 else 0):
+                when = stamp(published + 30 * (j + 1))
+                thread.append({
+                    "comment_id": f"{top_id}.r{j:05d}", "parent_id": top_id, "is_reply": True,
+                    "author": f"@author{rng.randrange(threads)}",
+                    "published_at": when, "updated_at": when,
+                    "like_count": rng.randrange(5),
+                    "text": " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 30))),
+                })
+            video_threads.append(thread)
+        fixture["videos"][video_id] = {
+            "title": f"Fake video {v}", "channel_id": channel_id,
+            "view_count": rng.randrange(10 ** 3, 10 ** 7), "like_count": rng.randrange(10 ** 5),
+            "threads": video_threads,
+        }
+    return fixture
+
+
+WORDS = ("great", "video", "thanks", "love", "this", "song", "first", "why", "is",
+         "nobody", "talking", "about", "the", "ending", "lol", "wow", "2024", "anyone",
+         "here", "still", "watching", "best", "part", "was", "at", "3:14", "so", "good")
+
+
+def load_fixture(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_fixture(fixture: dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(fixture, f, ensure_ascii=False)
+
+
+def record_fixture(video_ids, queries=()) -> dict:
+    """
+    Record a fixture from the live API (needs YOUTUBE_API_KEY): all
+    comments and the statistics of video_ids, plus the search results
+    of each query (100 quota units per query).
+    """
+    import youtube_comments_dump as dump
+
+    fixture = {"channel_id": None, "videos": {}, "searches": {}}
+    for query in queries:
+        resp = dump.SCHEDULER.get(f"{dump.BASE}/search", params={
+            "part": "snippet", "q": query, "type": "video", "maxResults": 50,
+            "fields": "items(id(videoId))", "key": dump.API_KEY})
+        resp.raise_for_status()
+        fixture["searches"][query] = [it["id"]["videoId"] for it in resp.json().get("items", [])]
+
+    for video_id in video_ids:
+        resp = dump.SCHEDULER.get(f"{dump.BASE}/videos", params={
+            "part": "snippet,statistics", "id": video_id,
+            "fields": "items(snippet(title,channelId),statistics(viewCount,likeCount))",
+            "key": dump.API_KEY})
+        resp.raise_for_status()
+        items = resp.json().get("items", [])
+        if not items:
+            print(f"[{video_id}] not found, skipped")
+            continue
+        sn, st = items[0]["snippet"], items[0]["statistics"]
+        threads = [list(t) for _, t in dump.iter_comment_threads(video_id)]
+        fixture["videos"][video_id] = {
+            "title": sn.get("title", ""), "channel_id": sn.get("channelId"),
+            "view_count": int(st.get("viewCount", 0)), "like_count": int(st.get("likeCount", 0)),
+            "threads": threads,
+        }
+        fixture["channel_id"] = fixture["channel_id"] or sn.get("channelId")
+        print(f"[{video_id}] recorded {sum(len(t) for t in threads)} comments")
+    return fixture
+
+
+# ----- Partial responses -----
+
+def parse_fields(spec: str) -> dict:
+    """
+    "nextPageToken,items(id,snippet(title))" ->
+    {"nextPageToken": None, "items": {"id": None, "snippet": {"title": None}}}
+    (None = keep the whole value). "a/b" is shorthand for "a(b)".
+    """
+    def parse(i):
+        out = {}
+        name = ""
+        while i < len(spec):
+            ch = spec[i]
+            if ch == "(":
+                sub, i = parse(i + 1)
+                _merge_path(out, name, sub)
+                name = ""
+            elif ch == ")":
+                break
+            elif ch == ",":
+                if name:
+                    _merge_path(out, name, None)
+                name = ""
+            else:
+                name += ch
+            i += 1
+        if name:
+            _merge_path(out, name, None)
+        return out, i
+
+    return parse(0)[0]
+
+
+def _merge_path(out: dict, path: str, sub):
+    *parents, leaf = path.strip().split("/")
+    for p in parents:
+        out = out.setdefault(p, {})
+    out[leaf] = sub
+
+
+def project(value, fields):
+    if fields is None:
+        return value
+    if isinstance(value, list):
+        return [project(v, fields) for v in value]
+    if isinstance(value, dict):
+        return {k: project(value[k], f) for k, f in fields.items() if k in value}
+    return value
+
+
+# ----- Resources -----
+
+def comment_resource(c: dict, video_id: str, text_format: str) -> dict:
+    text = c["text"]
+    snippet = {
+        "videoId": video_id,
+        "textDisplay": text.replace("\n", "<br>") if text_format == "html" else text,
+        "textOriginal": text,
+        "authorDisplayName": c["author"],
+        "likeCount": c["like_count"],
+        "publishedAt": c["published_at"],
+        "updatedAt": c["updated_at"] or c["published_at"],
+    }
+    if c["parent_id"]:
+        snippet["parentId"] = c["parent_id"]
+    return {"kind": "youtube#comment", "id": c["comment_id"], "snippet": snippet}
+
+
+def thread_resource(thread: list, video_id: str, text_format: str, with_replies: bool) -> dict:
+    top, replies = thread[0], thread[1:]
+    item = {
+        "kind": "youtube#commentThread",
+        "id": top["comment_id"],
+        "snippet": {
+            "videoId": video_id,
+            "topLevelComment": comment_resource(top, video_id, text_format),
+            "canReply": True,
+            "totalReplyCount": len(replies),
+            "isPublic": True,
+        },
+    }
+    if with_replies and replies:
+        item["replies"] = {"comments": [comment_resource(r, video_id, text_format)
+                                        for r in replies[:INLINE_REPLIES]]}
+    return item
+
+
+def encode_token(offset: int) -> str:
+    return base64.urlsafe_b64encode(f"o{offset}".encode()).decode().rstrip("=")
+
+
+def decode_token(token: str | None) -> int:
+    if not token:
+        return 0
+    raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+    return int(raw[1:])
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, reason: str, message: str, headers: dict | None = None):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+        self.headers = headers or {}
+
+    def body(self) -> dict:
+        return {"error": {"code": self.status, "message": str(self),
+                          "errors": [{"reason": self.reason, "message": str(self)}]}}
+
+
+# ----- Server -----
+
+class FakeYouTubeAPI:
+    """
+    Threaded HTTP server answering API_PATH/<endpoint> from a fixture.
+        latency / jitter  -> every response is delayed latency + U(0, jitter) s
+        error_403         -> share of requests failing with 403 rateLimitExceeded
+        error_429         -> share of requests failing with 429 (+ Retry-After)
+    .stats counts requests, injected errors and bytes sent per endpoint.
+    """
+
+    def __init__(self, fixture: dict, host: str = "127.0.0.1", port: int = 0,
+                 latency: float = 0.0, jitter: float = 0.0, error_403: float = 0.0,
+                 error_429: float = 0.0, retry_after: float = 1, seed: int = 0):
+        self.fixture = fixture
+        self.latency = latency
+        self.jitter = jitter
+        self.error_403 = error_403
+        self.error_429 = error_429
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": {}, "errors": {}, "bytes": {}}
+        self._threads_by_time = {}
+        self._threads_by_likes = {}
+        self._threads_by_id = {}
+        for video_id, video in fixture["videos"].items():
+            threads = video["threads"]
+            self._threads_by_time[video_id] = sorted(
+                threads, key=lambda t: t[0]["published_at"], reverse=True)
+            self._threads_by_likes[video_id] = sorted(
+                threads, key=lambda t: t[0]["like_count"], reverse=True)
+            for thread in threads:
+                self._threads_by_id[thread[0]["comment_id"]] = (video_id, thread)
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{API_PATH}"
+
+    def start(self) -> str:
+        """
+        Serve in a background thread; returns the base URL.
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base
+
+    def serve_forever(self):
+        """
+        Serve in the calling thread until interrupted.
+        """
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _count(self, kind: str, endpoint: str, n: int = 1):
+        with self._lock:
+            self.stats[kind][endpoint] = self.stats[kind].get(endpoint, 0) + n
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without this
+            # keep-alive responses stall on delayed ACKs
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                api._handle(self)
+
+        return Handler
+
+    def _handle(self, request):
+        url = urlparse(request.path)
+        endpoint = url.path[len(API_PATH):].strip("/") if url.path.startswith(API_PATH) else ""
+        params = dict(parse_qsl(url.query))
+        self._count("requests", endpoint)
+        delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+        headers = {}
+        try:
+            with self._lock:
+                roll = self._rng.random()
+            if roll < self.error_403:
+                raise ApiError(403, "rateLimitExceeded", "Injected rate limit error.")
+            if roll < self.error_403 + self.error_429:
+                raise ApiError(429, "rateLimitExceeded", "Injected 429.",
+                               {"Retry-After": f"{self.retry_after:g}"})
+            handler = getattr(self, f"_{endpoint}", None) if endpoint in MAX_PAGE else None
+            if handler is None:
+                raise ApiError(404, "notFound", f"Unknown endpoint {url.path!r}.")
+            body = handler(params)
+            if params.get("fields"):
+                body = project(body, parse_fields(params["fields"]))
+            status = 200
+        except ApiError as e:
+            self._count("errors", endpoint)
+            status, body, headers = e.status, e.body(), e.headers
+
+        raw = json.dumps(body).encode("utf-8")
+        self._count("bytes", endpoint, len(raw))
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json; charset=UTF-8")
+        request.send_header("Content-Length", str(len(raw)))
+        for key, value in headers.items():
+            request.send_header(key, value)
+        request.end_headers()
+        request.wfile.write(raw)
+
+    def _page(self, items: list, params: dict, endpoint: str) -> tuple:
+        size = int(params.get("maxResults", 5 if endpoint != "commentThreads" else 20))
+        if not 0 < size <= MAX_PAGE[endpoint]:
+            raise ApiError(400, "invalidParameter", f"maxResults must be 1..{MAX_PAGE[endpoint]}.")
+        try:
+            start = decode_token(params.get("pageToken"))
+        except ValueError:
+            raise ApiError(400, "invalidPageToken", "Invalid page token.") from None
+        body = {}
+        if start + size < len(items):
+            body["nextPageToken"] = encode_token(start + size)
+        body["pageInfo"] = {"totalResults": len(items), "resultsPerPage": size}
+        return items[start:start + size], body
+
+    def _commentThreads(self, params: dict) -> dict:
+        order = self._threads_by_likes if params.get("order") == "relevance" else self._threads_by_time
+        if "videoId" in params:
+            if params["videoId"] not in order:
+                raise ApiError(404, "videoNotFound", "The video identified by videoId could not be found.")
+            rows = [(params["videoId"], t) for t in order[params["videoId"]]]
+        elif "allThreadsRelatedToChannelId" in params:
+            channel = params["allThreadsRelatedToChannelId"]
+            rows = [(vid, t) for vid, threads in order.items()
+                    if self.fixture["videos"][vid].get("channel_id") == channel for t in threads]
+            rows.sort(key=lambda r: r[1][0]["published_at"], reverse=True)
+        else:
+            raise ApiError(400, "missingRequiredParameter", "No filter selected.")
+        rows, body = self._page(rows, params, "commentThreads")
+        with_replies = "replies" in params.get("part", "").split(",")
+        text_format = params.get("textFormat", "html")
+        body["items"] = [thread_resource(t, vid, text_format, with_replies) for vid, t in rows]
+        return body
+
+    def _comments(self, params: dict) -> dict:
+        if "parentId" not in params:
+            raise ApiError(400, "missingRequiredParameter", "No filter selected.")
+        found = self._threads_by_id.get(params["parentId"])
+        if found is None:
+            raise ApiError(404, "commentNotFound", "The parent comment could not be found.")
+        video_id, thread = found
+        replies, body = self._page(thread[1:], params, "comments")
+        text_format = params.get("textFormat", "html")
+        body["items"] = [comment_resource(r, video_id, text_format) for r in replies]
+        return body
+
+    def _search(self, params: dict) -> dict:
+        query = params.get("q", "")
+        ids = self.fixture.get("searches", {}).get(query)
+        if ids is None:
+            # Unrecorded query: a stable pseudo-random ranking of all videos
+            ids = sorted(self.fixture["videos"], key=lambda v: zlib.crc32(f"{query}|{v}".encode()))
+        ids = [v for v in ids if v in self.fixture["videos"]]
+        ids, body = self._page(ids, params, "search")
+        body["items"] = [{
+            "kind": "youtube#searchResult",
+            "id": {"kind": "youtube#video", "videoId": v},
+            "snippet": {"title": self.fixture["videos"][v]["title"],
+                        "channelId": self.fixture["videos"][v].get("channel_id")},
+        } for v in ids]
+        return body
+
+    def _videos(self, params: dict) -> dict:
+        ids = [v for v in params.get("id", "").split(",") if v]
+        if len(ids) > MAX_PAGE["videos"]:
+            raise ApiError(400, "invalidParameter", "Too many ids.")
+        items = []
+        for v in ids:
+            video = self.fixture["videos"].get(v)
+            if video is None:
+                continue
+            items.append({
+                "kind": "youtube#video",
+                "id": v,
+                "snippet": {"title": video["title"], "channelId": video.get("channel_id")},
+                "statistics": {
+                    "viewCount": str(video["view_count"]),
+                    "likeCount": str(video["like_count"]),
+                    "commentCount": str(sum(len(t) for t in video["threads"])),
+                },
+            })
+        return {"kind": "youtube#videoListResponse", "items": items,
+                "pageInfo": {"totalResults": len(items), "resultsPerPage": len(items)}}
+
+
+def fixture_from_args(args) -> dict:
+    if args.fixture:
+        return load_fixture(args.fixture)
+    return synthetic_fixture(videos=args.videos, threads=args.threads,
+                             reply_every=args.reply_every, replies=args.replies, seed=args.seed)
+
+
+def add_fixture_args(parser):
+    """
+    Fixture and fault-injection options, shared with benchmark_api.py.
+    """
+    parser.add_argument("--fixture", default=None, help="Fixture JSON (default: synthetic)")
+    parser.add_argument("--videos", type=int, default=3, help="Synthetic videos (default: 3)")
+    parser.add_argument("--threads", type=int, default=250,
+                        help="Synthetic comment threads per video (default: 250)")
+    parser.add_argument("--reply-every", type=int, default=3,
+                        help="Every Nth synthetic thread has replies (default: 3)")
+    parser.add_argument("--replies", type=int, default=7,
+                        help="Replies per synthetic thread with replies (default: 7)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency, 0..N seconds")
+    parser.add_argument("--error-403", type=float, default=0.0,
+                        help="Share of requests failing with 403 rateLimitExceeded")
+    parser.add_argument("--error-429", type=float, default=0.0,
+                        help="Share of requests failing with 429 Too Many Requests")
+    parser.add_argument("--retry-after", type=float, default=1,
+                        help="Retry-After seconds sent with 429s (default: 1)")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Local YouTube Data API stand-in.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_serve = sub.add_parser("serve", help="Serve a fixture until Ctrl-C")
+    add_fixture_args(p_serve)
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+
+    p_synth = sub.add_parser("synthesize", help="Write a synthetic fixture to a file")
+    add_fixture_args(p_synth)
+    p_synth.add_argument("out", help="Fixture JSON to write")
+
+    p_record = sub.add_parser("record", help="Record a fixture from the live API")
+    p_record.add_argument("out", help="Fixture JSON to write")
+    p_record.add_argument("--video", action="append", default=[], help="Video ID (repeatable)")
+    p_record.add_argument("--query", action="append", default=[], help="Search query (repeatable)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.command == "record":
+        save_fixture(record_fixture(args.video, args.query), args.out)
+        print(f"Saved to: {args.out}")
+        return
+    if args.command == "synthesize":
+        save_fixture(fixture_from_args(args), args.out)
+        print(f"Saved to: {args.out}")
+        return
+
+    api = FakeYouTubeAPI(fixture_from_args(args), host=args.host, port=args.port,
+                         latency=args.latency, jitter=args.jitter, error_403=args.error_403,
+                         error_429=args.error_429, retry_after=args.retry_after, seed=args.seed)
+    print(f"Serving {len(api.fixture['videos'])} videos at {api.base}")
+    print(f"    export YOUTUBE_API_BASE={api.base}")
+    try:
+        api.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(api.stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
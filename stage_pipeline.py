@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Small helpers for running a producer -> ... -> consumer chain of threads
+connected by bounded queues.
+
+Every queue holds at most queue_size items, so a slow stage blocks the
+stages feeding it instead of letting their output pile up in memory
+(backpressure). Each stage keeps throughput counters: items passed on,
+time spent working, and time spent blocked waiting for input (upstream
+too slow) or for room in its output queue (downstream too slow).
+An exception in any stage stops the whole pipeline and is re-raised in
+the consuming thread by check().
+"""
+import time
+import queue
+import threading
+from contextlib import contextmanager
+
+DONE = object()            # end-of-stream marker passed down the queues
+POLL_SECONDS = 0.1         # how often blocked stages look at the stop flag
+
+
+class StageStats:
+    """
+    Counters of one pipeline stage.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0            # seconds doing the stage's own work
+        self.waiting_input = 0.0   # seconds blocked on an empty input queue
+        self.waiting_output = 0.0  # seconds blocked on a full output queue
+        self.started = time.perf_counter()
+        self.finished = None
+
+    @contextmanager
+    def work(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.busy += time.perf_counter() - start
+
+    def elapsed(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def summary(self) -> dict:
+        elapsed = self.elapsed()
+        return {
+            "items": self.items,
+            "items_per_sec": self.items / elapsed if elapsed else None,
+            "busy_seconds": self.busy,
+            "waiting_input_seconds": self.waiting_input,
+            "waiting_output_seconds": self.waiting_output,
+            "elapsed_seconds": elapsed,
+        }
+
+    def summary_line(self) -> str:
+        s = self.summary()
+        rate = s["items_per_sec"] or 0.0
+        return (f"{self.name}: {self.items} items, {rate:.1f}/s, busy {self.busy:.2f}s, "
+                f"waiting for input {self.waiting_input:.2f}s / output {self.waiting_output:.2f}s")
+
+
+class Pipeline:
+    """
+    Threads and bounded queues of one pipeline run.
+        p = Pipeline(queue_size)
+        q = p.bounded_queue()
+        p.spawn(stats, func, ...)   # func uses p.put / p.get on its queues
+        ...
+        p.close()                   # stop every stage (always call it)
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = max(1, queue_size)
+        self.stop = threading.Event()
+        self.stages = []
+        self.errors = []
+        self._threads = []
+
+    def bounded_queue(self) -> queue.Queue:
+        return queue.Queue(maxsize=self.queue_size)
+
+    def stage(self, name: str) -> StageStats:
+        stats = StageStats(name)
+        self.stages.append(stats)
+        return stats
+
+    def spawn(self, stats: StageStats, func, *args):
+        """
+        Run func(*args) in a daemon thread as the stage counted by stats.
+        """
+        def target():
+            try:
+                func(*args)
+            except BaseException as e:
+                self.errors.append(e)
+                self.stop.set()
+            finally:
+                stats.finished = time.perf_counter()
+
+        thread = threading.Thread(target=target, name=f"pipeline-{stats.name}", daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def put(self, q: queue.Queue, item, stats: StageStats) -> bool:
+        """
+        Block until item fits in q; False if the pipeline stopped first.
+        """
+        start = time.perf_counter()
+        try:
+            while not self.stop.is_set():
+                try:
+                    q.put(item, timeout=POLL_SECONDS)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+        finally:
+            stats.waiting_output += time.perf_counter() - start
+
+    def get(self, q: queue.Queue, stats: StageStats):
+        """
+        Next item of q; DONE at the end of the stream or if the pipeline
+        stopped.
+        """
+        start = time.perf_counter()
+        try:
+            while not self.stop.is_set():
+                try:
+                    return q.get(timeout=POLL_SECONDS)
+                except queue.Empty:
+                    pass
+            return DONE
+        finally:
+            stats.waiting_input += time.perf_counter() - start
+
+    def check(self):
+        """
+        Re-raise the first exception raised by a stage.
+        """
+        if self.errors:
+            raise self.errors[0]
+
+    def close(self, timeout: float = 1.0):
+        """
+        Stop all stages. Threads blocked on a queue exit within
+        POLL_SECONDS; one stuck in a request is left to finish on its own.
+        """
+        self.stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def record(self, metrics, prefix: str = "pipeline"):
+        """
+        Add the per-stage times to an api_metrics.RequestMetrics.
+        """
+        for s in self.stages:
+            metrics.add_time(f"{prefix}_{s.name}_busy", s.busy)
+            metrics.add_time(f"{prefix}_{s.name}_waiting_input", s.waiting_input)
+            metrics.add_time(f"{prefix}_{s.name}_waiting_output", s.waiting_output)
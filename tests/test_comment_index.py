@@ -0,0 +1,56 @@
+import pytest
+
+from comment_index import DumpLookup, get_comment
+from youtube_comments_dump import ShardedDumpWriter, read_shard_manifest
+
+
+def make_comments(n):
+    return [{
+        "comment_id": f"Ug{i:05d}",
+        "parent_id": None,
+        "is_reply": False,
+        "author": f"author {i}",
+        "published_at": "2024-01-01T00:00:00Z",
+        "updated_at": "2024-01-01T00:00:00Z",
+        "like_count": i,
+        "text": f"comment number {i + 1}",
+    } for i in range(n)]
+
+
+@pytest.fixture
+def sharded_dump(tmp_path):
+    with ShardedDumpWriter(str(tmp_path / "dump.txt"), "vid00000000", "v",
+                           shard_bytes=2000) as writer:
+        writer.write_many(make_comments(40))
+    manifest = read_shard_manifest(writer.fpath)
+    assert len(manifest["shards"]) >= 3
+    return writer.fpath, manifest
+
+
+def test_get_record_in_second_shard(sharded_dump):
+    manifest_path, manifest = sharded_dump
+    second = manifest["shards"][1]
+    number = second["first"] + 1
+
+    with DumpLookup(second["path"]) as lookup:
+        assert lookup.first_number == second["first"]
+    assert get_comment(second["path"], number=number)[1]["text"] == f"comment number {number}"
+    found_number, c = get_comment(manifest_path, number=number)
+    assert found_number == number
+    assert c["comment_id"] == f"Ug{number - 1:05d}"
+
+
+def test_get_by_id_across_shards(sharded_dump):
+    manifest_path, manifest = sharded_dump
+    last = manifest["total"]
+    assert get_comment(manifest_path, comment_id=f"Ug{last - 1:05d}")[0] == last
+
+
+def test_get_out_of_range(sharded_dump):
+    manifest_path, manifest = sharded_dump
+    first_shard = manifest["shards"][0]["path"]
+    assert get_comment(manifest_path, number=manifest["total"] + 1) is None
+    # Numbers of other shards are not in the first one
+    assert get_comment(first_shard, number=manifest["shards"][0]["last"] + 1) is None
+    with pytest.raises(ValueError):
+        get_comment(manifest_path, number=0)
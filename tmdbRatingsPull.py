@@ -1,7 +1,8 @@
 import os
-import requests
 import csv
 
+import api_client
+
 # Read TMDb API key from environment variable
 API_KEY = os.getenv("TMDB_API_KEY")
 if not API_KEY:
@@ -34,7 +35,7 @@ def get_top_netflix(content_type="movie", pages=3):
             "page": page,
         }
 
-        response = requests.get(url, params=params)
+        response = api_client.get(url, params=params, timeout=30)
         response.raise_for_status()
         data = response.json()
 
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+YouTube video IDs from URLs, one at a time or in bulk.
+
+extract_video_id handles one input with urlparse / parse_qs. For long
+lists (e.g. a CSV column of millions of mixed watch, youtu.be, shorts
+and embed URLs) use resolve_video_ids:
+    - inputs are de-duplicated first, so each distinct string is
+      resolved once,
+    - the common URL shapes are matched by one precompiled regex
+      (FAST_RE); anything it doesn't match goes through extract_video_id,
+      so results are the same as calling extract_video_id on each input,
+    - results are memoized in an LRU cache shared across calls,
+    - the output is vectorized: video IDs plus an error mask, as pandas
+      Series (same index) for a Series input, lists otherwise.
+
+    ids, errors = resolve_video_ids(df["url"])
+    df["video_id"] = ids
+    bad = df[errors]
+"""
+import re
+from functools import lru_cache
+from typing import NamedTuple
+from urllib.parse import urlparse, parse_qs
+
+# --------- Config ----------
+CACHE_SIZE = 1 << 18       # distinct inputs memoized by resolve_video_id
+# ---------------------------
+
+VIDEO_ID = r"[A-Za-z0-9_-]{11}"
+BARE_ID_RE = re.compile(VIDEO_ID)
+# Only shapes whose answer is certain; e.g. shorts/embed URLs with a
+# "v=" in the query are left to extract_video_id, which prefers ?v=.
+FAST_RE = re.compile(
+    rf"""https?://(?:
+        (?:www\.)?youtu\.be/(?P<short>{VIDEO_ID})(?:[?\#].*)?
+      | (?:(?:www|m)\.)?youtube\.com/(?:
+            watch\?v=(?P<watch>{VIDEO_ID})(?:[&\#].*)?
+          | (?:shorts|embed)/(?P<path>{VIDEO_ID})/?(?:\?(?:(?!v=)[^\#])*)?(?:\#.*)?
+        )
+    )""",
+    re.VERBOSE | re.DOTALL,
+)
+
+
+def extract_video_id(url_or_id: str) -> str:
+    """
+    Extract a YouTube video ID from a full URL or return the ID if already given.
+    Handles typical watch, youtu.be, shorts, embed URLs.
+    """
+    url_or_id = url_or_id.strip()
+
+    # If it looks like a bare video ID
+    if "http" not in url_or_id and re.fullmatch(r"[A-Za-z0-9_-]{11}", url_or_id):
+        return url_or_id
+
+    parsed = urlparse(url_or_id)
+
+    # Short link: https://youtu.be/VIDEOID
+    if parsed.hostname in ("youtu.be", "www.youtu.be"):
+        return parsed.path.lstrip("/")
+
+    # Standard YouTube domains
+    if parsed.hostname in ("www.youtube.com", "youtube.com", "m.youtube.com"):
+        qs = parse_qs(parsed.query)
+
+        # Standard watch URL: https://www.youtube.com/watch?v=VIDEOID
+        if "v" in qs and qs["v"]:
+            return qs["v"][0]
+
+        # Shorts: https://www.youtube.com/shorts/VIDEOID
+        if parsed.path.startswith("/shorts/"):
+            return parsed.path.split("/shorts/")[1].split("/")[0]
+
+        # Embed: https://www.youtube.com/embed/VIDEOID
+        if parsed.path.startswith("/embed/"):
+            return parsed.path.split("/embed/")[1].split("/")[0]
+
+    raise ValueError(
+        f"Could not extract video ID from input: {url_or_id!r}. "
+        "Provide a full YouTube URL or an 11-character video ID."
+    )
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def resolve_video_id(url_or_id: str) -> str | None:
+    """
+    extract_video_id with a regex fast path and memoization; None
+    instead of ValueError for inputs without a video ID.
+    """
+    s = url_or_id.strip()
+    if "http" not in s and BARE_ID_RE.fullmatch(s):
+        return s
+    m = FAST_RE.fullmatch(s)
+    if m:
+        return m.group("short") or m.group("watch") or m.group("path")
+    try:
+        return extract_video_id(s)
+    except ValueError:
+        return None
+
+
+class ResolvedIds(NamedTuple):
+    ids: object      # video IDs (None where errors is True)
+    errors: object   # True where no video ID could be extracted
+
+
+def resolve_video_ids(values) -> ResolvedIds:
+    """
+    Video IDs of every item of values (a pandas Series or any iterable),
+    as ResolvedIds(ids, errors). Non-string items (None, NaN) are errors.
+    For a Series both are Series with its index (ids of dtype object);
+    otherwise both are lists.
+    """
+    if _is_series(values):
+        unique = values.unique()
+        mapping = {v: _resolve(v) for v in unique}
+        ids = values.map(mapping).astype(object)
+        errors = ids.isna()
+        ids[errors] = None
+        return ResolvedIds(ids, errors)
+
+    mapping = {}
+    ids = []
+    for v in values:
+        try:
+            video_id = mapping[v]
+        except KeyError:
+            video_id = mapping[v] = _resolve(v)
+        except TypeError:    # unhashable, so not a string either
+            video_id = None
+        ids.append(video_id)
+    return ResolvedIds(ids, [i is None for i in ids])
+
+
+def _resolve(value) -> str | None:
+    return resolve_video_id(value) if isinstance(value, str) else None
+
+
+def _is_series(values) -> bool:
+    # Checked by name so pandas is only needed when a Series is passed
+    return any(t.__module__.startswith("pandas") and t.__name__ == "Series"
+               for t in type(values).__mro__)
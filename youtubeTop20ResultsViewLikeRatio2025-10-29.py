@@ -5,19 +5,30 @@ import json
 import time
 import math
 import tempfile
-import requests
 import numpy as np
 import pandas as pd
 import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import urlencode
 
+import api_client
+from api_scheduler import QUOTA_ERRORS, RequestScheduler, describe_error, format_estimate, positive_rate
+
 # --------- Config ----------
 API_KEY = os.getenv("YOUTUBE_API_KEY")  # <-- put your key in env
-BASE = "https://www.googleapis.com/youtube/v3"
+BASE = os.getenv("YOUTUBE_API_BASE", "https://www.googleapis.com/youtube/v3")  # or a fake_youtube_api.py server
 MAX_RESULTS = 20  # top N
 ORDER = "relevance"  # or "viewCount", "date", etc.
+SEARCH_WORKERS = 8  # concurrent requests in --keywords mode (the rate limit still applies)
+VIDEOS_BATCH = 50  # max IDs per videos.list call
 # ---------------------------
 
+# Shared by every request of the run (rate limit, quota ledger, retries)
+SCHEDULER = RequestScheduler()
+
+# Partial-response projection for videos.list: only what top20_table reads
+VIDEO_FIELDS = "items(id,snippet(title),statistics(viewCount,likeCount))"
+
 def search_videos(query, max_results=MAX_RESULTS, order=ORDER):
     """Search YouTube for videos and return a list of video IDs (max 50 per call)."""
     params = {
@@ -26,11 +37,12 @@ def search_videos(query, max_results=MAX_RESULTS, order=ORDER):
         "type": "video",
         "maxResults": max_results,
         "order": order,
+        "fields": "items(id(kind,videoId))",
         "key": API_KEY,
     }
-    resp = requests.get(f"{BASE}/search", params=params, timeout=30)
+    resp = SCHEDULER.get(f"{BASE}/search", params=params, timeout=30)
     resp.raise_for_status()
-    data = resp.json()
+    data = SCHEDULER.json(resp)
     return [item["id"]["videoId"] for item in data.get("items", []) if item["id"]["kind"] == "youtube#video"]
 
 def get_video_stats(video_ids):
@@ -40,11 +52,43 @@ def get_video_stats(video_ids):
     params = {
         "part": "snippet,statistics",
         "id": ",".join(video_ids),
+        "fields": VIDEO_FIELDS,
         "key": API_KEY,
     }
-    resp = requests.get(f"{BASE}/videos", params=params, timeout=30)
+    resp = SCHEDULER.get(f"{BASE}/videos", params=params, timeout=30)
     resp.raise_for_status()
-    return resp.json().get("items", [])
+    return SCHEDULER.json(resp).get("items", [])
+
+def get_video_stats_batched(video_ids, workers=SEARCH_WORKERS):
+    """get_video_stats for any number of IDs: de-duplicated, fetched in full
+    VIDEOS_BATCH-ID calls, up to `workers` at once. Returns ({video_id: item},
+    {video_id: error} for the IDs of failed calls); a failed call doesn't stop
+    the others, but once the quota is exhausted the remaining ones are not sent."""
+    unique = list(dict.fromkeys(video_ids))
+    batches = [unique[i:i + VIDEOS_BATCH] for i in range(0, len(unique), VIDEOS_BATCH)]
+    items, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(get_video_stats, batch): batch for batch in batches}
+        for fut in as_completed(futures):
+            batch = futures[fut]
+            try:
+                for it in fut.result():
+                    items[it["id"]] = it
+            except QUOTA_ERRORS as e:
+                errors.update(dict.fromkeys(batch, str(e)))
+                for other in futures:
+                    other.cancel()
+            except Exception as e:
+                errors.update(dict.fromkeys(batch, describe_error(e)))
+    for fut, batch in futures.items():
+        if fut.cancelled():
+            errors.update(dict.fromkeys(batch, "not started (quota exhausted)"))
+    return items, errors
+
+def estimate_quota_calls(max_results=MAX_RESULTS, queries=1):
+    """Dry-run estimate of the API calls top20_table (or multi_query_table for
+    `queries` queries, assuming no shared videos) makes, as {endpoint: calls}."""
+    return {"search": queries, "videos": math.ceil(queries * max_results / VIDEOS_BATCH)}
 
 def safe_int(x):
     try:
@@ -57,13 +101,14 @@ def keyword_to_safe_filename(s):
     s = re.sub(r"[^a-z0-9]+", "_", s)
     return s.strip("_") or "query"
 
-def top20_table(query, out_dir=None):
-    if not API_KEY:
-        raise RuntimeError("Missing YOUTUBE_API_KEY environment variable.")
-
-    video_ids = search_videos(query, max_results=MAX_RESULTS)
-    items = get_video_stats(video_ids)
+def read_keywords(path):
+    """One query per line; blank lines and # comments are skipped, duplicates dropped."""
+    with open(path, encoding="utf-8") as f:
+        lines = [line.strip() for line in f]
+    return list(dict.fromkeys(line for line in lines if line and not line.startswith("#")))
 
+def stats_table(items):
+    """The ratio table (sorted by view_to_like_ratio, NaN last) of videos.list items."""
     rows = []
     for it in items:
         vid = it["id"]
@@ -87,37 +132,127 @@ def top20_table(query, out_dir=None):
             "view_to_like_ratio": v2l,
         })
 
-    df = pd.DataFrame(rows)
+    df = pd.DataFrame(rows, columns=["title", "url", "views", "likes", "view_to_like_ratio"])
     df["views"] = pd.to_numeric(df["views"], errors="coerce")
     df["likes"] = pd.to_numeric(df["likes"], errors="coerce")
     df["view_to_like_ratio"] = pd.to_numeric(df["view_to_like_ratio"], errors="coerce")
 
     # Sort by highest view_to_like_ratio (NaN last)
-    df = df.sort_values(
+    return df.sort_values(
         by="view_to_like_ratio",
         ascending=False,
         na_position="last",
         kind="mergesort"
     ).reset_index(drop=True)
 
-    # Save CSV (default: temp dir), filename includes keyword + timestamp
+def save_table(df, name, out_dir=None):
+    """Save df as youtube_top20_<name>_<timestamp>.csv in out_dir (default: temp dir)."""
     if out_dir is None:
         out_dir = tempfile.gettempdir()
     os.makedirs(out_dir, exist_ok=True)
-    fname = f"youtube_top20_{keyword_to_safe_filename(query)}_{time.strftime('%Y%m%d-%H%M%S')}.csv"
+    fname = f"youtube_top20_{name}_{time.strftime('%Y%m%d-%H%M%S')}.csv"
     fpath = os.path.join(out_dir, fname)
     df.to_csv(fpath, index=False)
+    return fpath
+
+def top20_table(query, out_dir=None):
+    if not API_KEY:
+        raise RuntimeError("Missing YOUTUBE_API_KEY environment variable.")
+
+    video_ids = search_videos(query, max_results=MAX_RESULTS)
+    items = get_video_stats(video_ids)
+    df = stats_table(items)
+
+    # Save CSV (default: temp dir), filename includes keyword + timestamp
+    fpath = save_table(df, keyword_to_safe_filename(query), out_dir)
 
     return df, fpath
 
+def multi_query_table(queries, out_dir=None, workers=SEARCH_WORKERS):
+    """top20_table for many queries in one run: the searches run up to `workers`
+    at once under SCHEDULER's rate limit, then the video IDs of all queries are
+    de-duplicated and fetched in full VIDEOS_BATCH-ID videos.list calls.
+    Returns (combined table with a leading "query" column, CSV path, failed
+    {query: error}). Failed searches are skipped; once the quota (budget or
+    the API's daily quota) is exhausted the remaining ones are not sent.
+    Queries whose videos.list calls failed are also in failed, and keep the
+    videos whose stats were fetched, so the table is always saved."""
+    if not API_KEY:
+        raise RuntimeError("Missing YOUTUBE_API_KEY environment variable.")
+
+    found, failed = {}, {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(search_videos, q, MAX_RESULTS): q for q in queries}
+        for fut in as_completed(futures):
+            q = futures[fut]
+            try:
+                found[q] = fut.result()
+            except QUOTA_ERRORS as e:
+                failed[q] = str(e)
+                for other in futures:
+                    other.cancel()
+            except Exception as e:
+                failed[q] = describe_error(e)
+    for fut, q in futures.items():
+        if fut.cancelled():
+            failed[q] = "not started (quota exhausted)"
+
+    items, stats_errors = get_video_stats_batched((v for q in queries for v in found.get(q, [])),
+                                                  workers)
+    for q, video_ids in found.items():
+        missing = [v for v in video_ids if v in stats_errors]
+        if missing:
+            failed[q] = (f"stats of {len(missing)} of {len(video_ids)} videos missing "
+                         f"({stats_errors[missing[0]]})")
+    tables = [stats_table([items[v] for v in found[q] if v in items]).assign(query=q)
+              for q in queries if found.get(q)]
+    combined = pd.concat(tables, ignore_index=True) if tables else stats_table([]).assign(query="")
+    combined = combined[["query"] + [c for c in combined.columns if c != "query"]]
+    fpath = save_table(combined, f"{len(found)}queries", out_dir)
+    return combined, fpath, failed
+
 def parse_args():
     parser = argparse.ArgumentParser(description="Fetch top YouTube videos for a query and save a CSV.")
-    parser.add_argument("query", help="YouTube search query (quote it if it has spaces)")
+    parser.add_argument("query", nargs="?", help="YouTube search query (quote it if it has spaces)")
+    parser.add_argument("--keywords", default=None, help="File with one query per line: run them all concurrently into one combined CSV with a query column")
+    parser.add_argument("--workers", type=int, default=SEARCH_WORKERS, help=f"Concurrent requests with --keywords (default: {SEARCH_WORKERS})")
     parser.add_argument("--out-dir", default=None, help="Directory to save CSV (default: system temp dir)")
-    return parser.parse_args()
+    parser.add_argument("--rate", type=positive_rate, default=None, help="Maximum API requests per second (default: 10)")
+    parser.add_argument("--quota-budget", type=int, default=None, help="Stop before using more than this many quota units")
+    parser.add_argument("--estimate", action="store_true", help="Only print the quota units this run would use")
+    parser.add_argument("--measure-savings", action="store_true", help="Re-request one page per endpoint without fields= to report payload bytes saved")
+    parser.add_argument("--metrics-json", default=None, help="Write a JSON summary of request timings, sizes, statuses and retries")
+    parser.add_argument("--metrics-prom", default=None, help="Write the request metrics in Prometheus text format")
+    args = parser.parse_args()
+    if (args.query is None) == (args.keywords is None):
+        parser.error("give either a query or --keywords FILE")
+    return args
 
 if __name__ == "__main__":
     args = parse_args()
-    table, csv_path = top20_table(args.query, args.out_dir)
-    print(table)
-    print("\nSaved to:", csv_path)
+    SCHEDULER.configure(rate=args.rate, budget=args.quota_budget, measure_savings=args.measure_savings)
+    queries = read_keywords(args.keywords) if args.keywords else [args.query]
+    # One pooled connection per concurrent request
+    api_client.configure(pool_size=max(api_client.POOL_SIZE, args.workers))
+    if args.estimate:
+        print("Estimated quota:")
+        print(format_estimate(estimate_quota_calls(queries=len(queries))))
+    else:
+        try:
+            if args.keywords:
+                print(f"Searching {len(queries)} queries, {args.workers} at a time ...")
+                table, csv_path, failed = multi_query_table(queries, args.out_dir, workers=args.workers)
+                print(table)
+                for q, error in failed.items():
+                    print(f"  failed: {q} ({error})")
+                print(f"\n{len(queries) - len(failed)} queries ok, {len(failed)} failed; "
+                      f"{table['url'].nunique()} distinct videos")
+            else:
+                table, csv_path = top20_table(args.query, args.out_dir)
+                print(table)
+            print("\nSaved to:", csv_path)
+            print(SCHEDULER.ledger.summary())
+            print(SCHEDULER.payload.summary())
+            print(SCHEDULER.metrics.summary_line())
+        finally:
+            SCHEDULER.metrics.write(args.metrics_json, args.metrics_prom)
@@ -1,58 +1,67 @@
 #!/usr/bin/env python3
 import os
 import re
+import sys
+import glob
+import json
 import time
+import hashlib
 import argparse
-from urllib.parse import urlparse, parse_qs
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import requests
 
+import api_client
+from comment_columns import CommentColumns
+from comment_formats import open_format_writer
+from comment_index import IndexBuilder, index_path, write_dump_index
+import dump_codecs
+from dump_codecs import CODECS, open_compressed_writer, open_dump_text
+from comment_store import SQLiteCommentWriter, default_db_path
+from api_scheduler import (
+    QUOTA_ERRORS, RequestScheduler, describe_error, format_estimate, positive_rate,
+)
+from stage_pipeline import DONE, Pipeline
+from video_ids import extract_video_id
+
 # --------- Config ----------
 API_KEY = os.getenv("YOUTUBE_API_KEY")  # <-- env var with your key
-BASE = "https://www.googleapis.com/youtube/v3"
+BASE = os.getenv("YOUTUBE_API_BASE", "https://www.googleapis.com/youtube/v3")  # or a fake_youtube_api.py server
 MAX_RESULTS = 100          # max per API page
 ORDER = "time"             # "time" or "relevance"
 TEXT_FORMAT = "plainText"  # YouTube API valid: "plainText" or "html"
+REPLY_WORKERS = 8          # concurrent comments.list fetches (1 = serial)
+BATCH_PARALLEL = 4         # videos crawled at once in batch mode
+MAX_OPEN_DUMPS = 64        # per-video files kept open at once in channel mode
+COMPRESSION = None         # text dumps: None, "gzip", "xz" or "zstd"
+SHARD_MB = None            # text dumps: rotate into shards of about this many MB (None = one file)
+PIPELINE_QUEUE = 2 * MAX_RESULTS  # threads buffered between pipeline stages (--pipeline)
+# Output formats and their file extensions (sqlite writes into --db instead)
+FORMATS = {"text": ".txt", "jsonl": ".jsonl", "parquet": ".parquet",
+           "arrow": ".arrow", "sqlite": None}
 # ---------------------------
 
+# Shared by every request of the run (rate limit, quota ledger, retries)
+SCHEDULER = RequestScheduler()
 
-def extract_video_id(url_or_id: str) -> str:
-    """
-    Extract a YouTube video ID from a full URL or return the ID if already given.
-    Handles typical watch, youtu.be, shorts, embed URLs.
-    """
-    url_or_id = url_or_id.strip()
-
-    # If it looks like a bare video ID
-    if "http" not in url_or_id and re.fullmatch(r"[A-Za-z0-9_-]{11}", url_or_id):
-        return url_or_id
-
-    parsed = urlparse(url_or_id)
-
-    # Short link: https://youtu.be/VIDEOID
-    if parsed.hostname in ("youtu.be", "www.youtu.be"):
-        return parsed.path.lstrip("/")
-
-    # Standard YouTube domains
-    if parsed.hostname in ("www.youtube.com", "youtube.com", "m.youtube.com"):
-        qs = parse_qs(parsed.query)
-
-        # Standard watch URL: https://www.youtube.com/watch?v=VIDEOID
-        if "v" in qs and qs["v"]:
-            return qs["v"][0]
-
-        # Shorts: https://www.youtube.com/shorts/VIDEOID
-        if parsed.path.startswith("/shorts/"):
-            return parsed.path.split("/shorts/")[1].split("/")[0]
-
-        # Embed: https://www.youtube.com/embed/VIDEOID
-        if parsed.path.startswith("/embed/"):
-            return parsed.path.split("/embed/")[1].split("/")[0]
-
-    raise ValueError(
-        f"Could not extract video ID from input: {url_or_id!r}. "
-        "Provide a full YouTube URL or an 11-character video ID."
-    )
+# Partial-response projections (fields=): only the keys read below are
+# downloaded and decoded.
+COMMENT_SNIPPET_KEYS = ("authorDisplayName", "publishedAt", "updatedAt",
+                        "likeCount", "textOriginal")
+COMMENT_FIELDS = f"id,snippet({','.join(COMMENT_SNIPPET_KEYS)})"
+REPLIES_FIELDS = f"nextPageToken,items({COMMENT_FIELDS})"
+THREADS_FIELDS = (
+    f"nextPageToken,items(snippet(totalReplyCount,topLevelComment({COMMENT_FIELDS})))"
+)
+THREADS_WITH_REPLIES_FIELDS = (
+    f"nextPageToken,items(snippet(totalReplyCount,topLevelComment({COMMENT_FIELDS})),"
+    f"replies(comments({COMMENT_FIELDS})))"
+)
+# Channel-wide listings also need each thread's videoId
+CHANNEL_THREADS_FIELDS = THREADS_FIELDS.replace("snippet(totalReplyCount", "snippet(videoId,totalReplyCount")
+CHANNEL_THREADS_WITH_REPLIES_FIELDS = THREADS_WITH_REPLIES_FIELDS.replace(
+    "snippet(totalReplyCount", "snippet(videoId,totalReplyCount")
 
 
 def safe_for_filename(s: str) -> str:
@@ -68,11 +77,38 @@ def safe_for_filename(s: str) -> str:
     return s or "video"
 
 
+def comment_from_snippet(comment_id: str, parent_id: str | None, sn: dict) -> dict:
+    """
+    Build the comment dict used throughout this script from an API
+    comment resource's snippet.
+    """
+    return {
+        "comment_id": comment_id,
+        "parent_id": parent_id,
+        "is_reply": parent_id is not None,
+        "author": sn.get("authorDisplayName", ""),
+        "published_at": sn.get("publishedAt", ""),
+        "updated_at": sn.get("updatedAt", ""),
+        "like_count": sn.get("likeCount", 0),
+        "text": (sn.get("textOriginal", "") or "")
+                .replace("\r\n", "\n").replace("\r", "\n"),
+    }
+
+
 def fetch_replies(parent_id: str, text_format: str = TEXT_FORMAT):
     """
     Fetch all replies to a top-level comment using comments.list.
     Returns a list of comment dicts (replies).
     """
+    return [comment_from_snippet(item["id"], parent_id, item["snippet"])
+            for item in fetch_reply_items(parent_id, text_format)]
+
+
+def fetch_reply_items(parent_id: str, text_format: str = TEXT_FORMAT):
+    """
+    Like fetch_replies, but returns the raw API comment resources
+    (the pipeline normalizes them in a stage of its own).
+    """
     all_replies = []
     page_token = None
 
@@ -82,12 +118,13 @@ def fetch_replies(parent_id: str, text_format: str = TEXT_FORMAT):
             "parentId": parent_id,
             "maxResults": MAX_RESULTS,
             "textFormat": text_format,
+            "fields": REPLIES_FIELDS,
             "key": API_KEY,
         }
         if page_token:
             params["pageToken"] = page_token
 
-        resp = requests.get(f"{BASE}/comments", params=params, timeout=30)
+        resp = SCHEDULER.get(f"{BASE}/comments", params=params, timeout=30)
         try:
             resp.raise_for_status()
         except requests.HTTPError:
@@ -99,21 +136,9 @@ def fetch_replies(parent_id: str, text_format: str = TEXT_FORMAT):
                 print("Error fetching replies, status:", resp.status_code, resp.text[:500])
             raise
 
-        data = resp.json()
-
-        for item in data.get("items", []):
-            sn = item["snippet"]
-            all_replies.append({
-                "comment_id": item["id"],
-                "parent_id": parent_id,
-                "is_reply": True,
-                "author": sn.get("authorDisplayName", ""),
-                "published_at": sn.get("publishedAt", ""),
-                "updated_at": sn.get("updatedAt", ""),
-                "like_count": sn.get("likeCount", 0),
-                "text": (sn.get("textOriginal", "") or "")
-                        .replace("\r\n", "\n").replace("\r", "\n"),
-            })
+        data = SCHEDULER.json(resp)
+
+        all_replies.extend(data.get("items", []))
 
         page_token = data.get("nextPageToken")
         if not page_token:
@@ -122,86 +147,301 @@ def fetch_replies(parent_id: str, text_format: str = TEXT_FORMAT):
     return all_replies
 
 
-def fetch_all_comments(video_id: str, text_format: str = TEXT_FORMAT):
+def fetch_comment_threads_page(video_id: str | None, page_token: str | None = None,
+                               text_format: str = TEXT_FORMAT,
+                               inline_replies: bool = False,
+                               channel_id: str | None = None) -> dict:
     """
-    Fetch all top-level comments and all their replies for the given video_id.
-    Returns a list of comment dicts.
+    Fetch one commentThreads page for video_id (newest first with
+    ORDER = "time"), or, with channel_id instead, one page of all threads
+    related to that channel (each thread's snippet then has its videoId).
+    Returns the decoded API response.
     """
-    all_comments = []
-    page_token = None
-
-    while True:
-        params = {
-            "part": "snippet",
-            "videoId": video_id,
-            "maxResults": MAX_RESULTS,
-            "textFormat": text_format,
-            "order": ORDER,
-            "key": API_KEY,
-        }
-        if page_token:
-            params["pageToken"] = page_token
+    params = {
+        "part": "snippet,replies" if inline_replies else "snippet",
+        "maxResults": MAX_RESULTS,
+        "textFormat": text_format,
+        "order": ORDER,
+        "key": API_KEY,
+    }
+    if channel_id:
+        params["allThreadsRelatedToChannelId"] = channel_id
+        params["fields"] = (CHANNEL_THREADS_WITH_REPLIES_FIELDS if inline_replies
+                            else CHANNEL_THREADS_FIELDS)
+    else:
+        params["videoId"] = video_id
+        params["fields"] = THREADS_WITH_REPLIES_FIELDS if inline_replies else THREADS_FIELDS
+    if page_token:
+        params["pageToken"] = page_token
 
-        resp = requests.get(f"{BASE}/commentThreads", params=params, timeout=30)
+    resp = SCHEDULER.get(f"{BASE}/commentThreads", params=params, timeout=30)
+    try:
+        resp.raise_for_status()
+    except requests.HTTPError:
+        # Print API error JSON for debugging
         try:
-            resp.raise_for_status()
-        except requests.HTTPError:
-            # Print API error JSON for debugging
-            try:
-                err = resp.json()
-                print("Error fetching comment threads:", err)
-            except Exception:
-                print("Error fetching comment threads, status:",
-                      resp.status_code, resp.text[:500])
-            raise
+            err = resp.json()
+            print("Error fetching comment threads:", err)
+        except Exception:
+            print("Error fetching comment threads, status:",
+                  resp.status_code, resp.text[:500])
+        raise
 
-        data = resp.json()
+    return SCHEDULER.json(resp)
 
-        items = data.get("items", [])
-        if not items and not data.get("nextPageToken"):
-            # No comments, or comments disabled, or video not found
-            break
 
-        for item in items:
-            snippet = item["snippet"]
-            top = snippet["topLevelComment"]
-            top_sn = top["snippet"]
-            top_id = top["id"]
-
-            # Top-level comment
-            all_comments.append({
-                "comment_id": top_id,
-                "parent_id": None,
-                "is_reply": False,
-                "author": top_sn.get("authorDisplayName", ""),
-                "published_at": top_sn.get("publishedAt", ""),
-                "updated_at": top_sn.get("updatedAt", ""),
-                "like_count": top_sn.get("likeCount", 0),
-                "text": (top_sn.get("textOriginal", "") or "")
-                        .replace("\r\n", "\n").replace("\r", "\n"),
-            })
+def estimate_dump_quota(video_id: str, inline_replies: bool = False) -> dict:
+    """
+    Dry-run estimate of the API calls a full dump of video_id will make,
+    as {endpoint: calls}. Uses the video's commentCount and the first
+    commentThreads page as a sample of how replies are distributed
+    (these two lookups cost 2 units themselves).
+    """
+    resp = SCHEDULER.get(f"{BASE}/videos", params={
+        "part": "statistics", "id": video_id,
+        "fields": "items(statistics(commentCount))", "key": API_KEY}, timeout=30)
+    resp.raise_for_status()
+    items = SCHEDULER.json(resp).get("items", [])
+    comment_count = int(items[0]["statistics"].get("commentCount", 0)) if items else 0
 
-            # Fetch all replies if any
-            total_replies = snippet.get("totalReplyCount", 0)
-            if total_replies:
-                replies = fetch_replies(top_id, text_format=text_format)
-                all_comments.extend(replies)
+    sample = fetch_comment_threads_page(video_id, inline_replies=inline_replies).get("items", [])
+    if not sample:
+        return {"commentThreads": 1}
 
-        page_token = data.get("nextPageToken")
-        if not page_token:
-            break
+    reply_counts = [it["snippet"].get("totalReplyCount", 0) for it in sample]
+    # Reply pages each sampled thread would need from comments.list
+    reply_pages = [
+        -(-n // MAX_RESULTS)
+        if n and not (inline_replies and len((it.get("replies") or {}).get("comments", [])) >= n)
+        else 0
+        for it, n in zip(sample, reply_counts)
+    ]
+    comments_per_thread = 1 + sum(reply_counts) / len(sample)
+    threads = max(len(sample), round(comment_count / comments_per_thread))
+    return {
+        "commentThreads": -(-threads // MAX_RESULTS),
+        "comments": round(threads * sum(reply_pages) / len(sample)),
+    }
 
-    return all_comments
 
+def submit_thread_replies(pool, item: dict, text_format: str = TEXT_FORMAT,
+                          inline_replies: bool = False):
+    """
+    Replies of one commentThreads item: the embedded replies when
+    inline_replies is set and they are complete, otherwise a Future from
+    `pool` fetching all of them with fetch_replies (or [] if there are none).
+    """
+    snippet = item["snippet"]
+    top_id = snippet["topLevelComment"]["id"]
+    total_replies = snippet.get("totalReplyCount", 0)
+    inline = (item.get("replies") or {}).get("comments", [])
+    if inline_replies and len(inline) >= total_replies:
+        return [comment_from_snippet(r["id"], top_id, r["snippet"]) for r in inline]
+    if total_replies:
+        return pool.submit(fetch_replies, top_id, text_format)
+    return []
 
-def save_comments_to_file(comments, video_id: str, label: str, out_dir: str | None = None) -> str:
+
+def iter_comment_threads(video_id: str, text_format: str = TEXT_FORMAT,
+                         workers: int = REPLY_WORKERS, inline_replies: bool = False,
+                         page_token: str | None = None, skip_parents=()):
     """
-    Save all comments into a single UTF-8 text file.
+    Yield (page_token, thread) for every comment thread of the given
+    video_id. thread is a list of comment dicts: the top-level comment
+    followed by its replies; page_token is the token the thread's
+    commentThreads page was requested with (None for the first page).
+    Threads are yielded page by page as the API returns them, so only one
+    commentThreads page (and its replies) is held in memory at a time.
+    Replies for the threads on each page are fetched by up to `workers`
+    threads at once; output order is the same as a serial fetch.
+    inline_replies:
+        - False -> part=snippet; comments.list is called for every thread
+                   that has replies.
+        - True  -> part=snippet,replies; the replies embedded in each thread
+                   are used, and comments.list is only called when
+                   totalReplyCount is larger than the embedded count.
+    page_token / skip_parents:
+        Start paging at page_token instead of the first page and skip the
+        threads whose top-level comment_id is in skip_parents (used to
+        resume an interrupted dump).
+    """
+    pool = ThreadPoolExecutor(max_workers=max(1, workers))
+    try:
+        while True:
+            data = fetch_comment_threads_page(video_id, page_token, text_format=text_format,
+                                              inline_replies=inline_replies)
+
+            items = data.get("items", [])
+            if not items and not data.get("nextPageToken"):
+                # No comments, or comments disabled, or video not found
+                break
+
+            # Queue reply fetches for the whole page before collecting any
+            # of them, so the round trips overlap.
+            page = []
+            for item in items:
+                top = item["snippet"]["topLevelComment"]
+                if top["id"] in skip_parents:
+                    continue
+                comment = comment_from_snippet(top["id"], None, top["snippet"])
+                replies = submit_thread_replies(pool, item, text_format=text_format,
+                                                inline_replies=inline_replies)
+                page.append((comment, replies))
+
+            for comment, replies in page:
+                if not isinstance(replies, list):
+                    replies = replies.result()
+                yield page_token, [comment] + replies
+
+            page_token = data.get("nextPageToken")
+            if not page_token:
+                break
+    finally:
+        # Don't wait for queued reply fetches if the consumer stopped early
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_comment_threads_pipelined(video_id: str, text_format: str = TEXT_FORMAT,
+                                   workers: int = REPLY_WORKERS, inline_replies: bool = False,
+                                   page_token: str | None = None, skip_parents=(),
+                                   queue_size: int | None = None, stages: list | None = None):
+    """
+    Same output as iter_comment_threads, produced by a pipeline of threads:
+        fetch      pages commentThreads and queues the reply fetches
+                   (up to `workers` at once) of each page,
+        normalize  waits for each thread's replies and builds the comment
+                   dicts (text newline normalization),
+        write      the caller consuming this generator.
+    Stages are connected by queues of queue_size threads (PIPELINE_QUEUE
+    by default), so the next pages are fetched while the caller writes,
+    but a slow writer stalls the fetcher rather than growing memory: at
+    most two queues plus one page of threads are in flight.
+    stages: if given a list, the stage_pipeline.StageStats of the fetch,
+    normalize and write stages are appended to it.
+    The stage times are also added to SCHEDULER.metrics timers.
+    """
+    pipeline = Pipeline(queue_size or PIPELINE_QUEUE)
+    raw_threads, threads = pipeline.bounded_queue(), pipeline.bounded_queue()
+    fetch, normalize, write = (pipeline.stage(name) for name in ("fetch", "normalize", "write"))
+    if stages is not None:
+        stages.extend(pipeline.stages)
+    pipeline.spawn(fetch, _fetch_stage, pipeline, fetch, raw_threads, video_id, text_format,
+                   workers, inline_replies, page_token, skip_parents)
+    pipeline.spawn(normalize, _normalize_stage, pipeline, normalize, raw_threads, threads)
+    try:
+        while True:
+            entry = pipeline.get(threads, write)
+            if entry is DONE:
+                break
+            with write.work():
+                yield entry
+            write.items += 1
+        pipeline.check()
+    finally:
+        write.finished = time.perf_counter()
+        pipeline.close()
+        pipeline.record(SCHEDULER.metrics)
+
+
+def _fetch_stage(pipeline: Pipeline, stats, out, video_id: str, text_format: str,
+                 workers: int, inline_replies: bool, page_token: str | None, skip_parents):
+    # Puts (page_token, commentThreads item, raw replies or a Future of them)
+    pool = ThreadPoolExecutor(max_workers=max(1, workers))
+    try:
+        while not pipeline.stop.is_set():
+            with stats.work():
+                data = fetch_comment_threads_page(video_id, page_token, text_format=text_format,
+                                                  inline_replies=inline_replies)
+                items = data.get("items", [])
+                if not items and not data.get("nextPageToken"):
+                    break
+                page = []
+                for item in items:
+                    snippet = item["snippet"]
+                    top_id = snippet["topLevelComment"]["id"]
+                    if top_id in skip_parents:
+                        continue
+                    total_replies = snippet.get("totalReplyCount", 0)
+                    inline = (item.get("replies") or {}).get("comments", [])
+                    if inline_replies and len(inline) >= total_replies:
+                        replies = inline
+                    elif total_replies:
+                        replies = pool.submit(fetch_reply_items, top_id, text_format)
+                    else:
+                        replies = []
+                    page.append((page_token, item, replies))
+            for entry in page:
+                if not pipeline.put(out, entry, stats):
+                    return
+                stats.items += 1
+            page_token = data.get("nextPageToken")
+            if not page_token:
+                break
+        pipeline.put(out, DONE, stats)
+    finally:
+        # Queued reply fetches are still needed by the normalizer unless stopping
+        pool.shutdown(wait=False, cancel_futures=pipeline.stop.is_set())
+
+
+def _normalize_stage(pipeline: Pipeline, stats, inbox, out):
+    while True:
+        entry = pipeline.get(inbox, stats)
+        if entry is DONE:
+            pipeline.put(out, DONE, stats)
+            return
+        page_token, item, replies = entry
+        if not isinstance(replies, list):
+            # Waiting for a reply fetch counts as waiting for input
+            start = time.perf_counter()
+            replies = replies.result()
+            stats.waiting_input += time.perf_counter() - start
+        with stats.work():
+            top = item["snippet"]["topLevelComment"]
+            thread = [comment_from_snippet(top["id"], None, top["snippet"])]
+            thread.extend(comment_from_snippet(r["id"], top["id"], r["snippet"]) for r in replies)
+        if not pipeline.put(out, (page_token, thread), stats):
+            return
+        stats.items += 1
+
+
+def iter_all_comments(video_id: str, text_format: str = TEXT_FORMAT,
+                      workers: int = REPLY_WORKERS, inline_replies: bool = False):
+    """
+    Yield all top-level comments and all their replies for the given
+    video_id, one comment dict at a time (see iter_comment_threads).
+    """
+    for _, thread in iter_comment_threads(video_id, text_format=text_format,
+                                          workers=workers, inline_replies=inline_replies):
+        yield from thread
+
+
+def fetch_all_comments(video_id: str, text_format: str = TEXT_FORMAT,
+                       workers: int = REPLY_WORKERS, inline_replies: bool = False):
+    """
+    Fetch all top-level comments and all their replies for the given video_id
+    (see iter_comment_threads for the options).
+    Returns a comment_columns.CommentColumns: a list-like sequence whose
+    items read like the comment dicts, stored column-wise so a large
+    video takes a fraction of the memory of a list of dicts (use
+    .to_dicts() for real dicts).
+    For large videos prefer iter_all_comments + CommentDumpWriter, which
+    never hold more than one page in memory.
+    """
+    comments = CommentColumns()
+    for _, thread in iter_comment_threads(video_id, text_format=text_format,
+                                          workers=workers, inline_replies=inline_replies):
+        comments.extend(thread)
+    return comments
+
+
+def comments_file_path(label: str, out_dir: str | None = None, ext: str = ".txt") -> str:
+    """
+    Build the output path for a dump of `label`.
     out_dir:
         - None  -> current working directory (os.getcwd()).
         - else  -> that directory (created if missing).
     File name format:
-        YouTube_comments_for_video_<safe(label)>_<YYYYMMDD>.txt
+        YouTube_comments_for_video_<safe(label)>_<YYYYMMDD><ext>
     """
     if out_dir is None:
         out_dir = os.getcwd()
@@ -210,65 +450,1299 @@ def save_comments_to_file(comments, video_id: str, label: str, out_dir: str | No
 
     today = time.strftime("%Y%m%d")
     safe_label = safe_for_filename(label)
-    fname = f"YouTube_comments_for_video_{safe_label}_{today}.txt"
-    fpath = os.path.join(out_dir, fname)
-
-    with open(fpath, "w", encoding="utf-8") as f:
-        f.write(f"Video ID: {video_id}\n")
-        f.write(f"Original input: {label}\n")
-        f.write(f"Total comments (including replies): {len(comments)}\n")
-        f.write("=" * 80 + "\n\n")
-
-        for idx, c in enumerate(comments, start=1):
-            kind = "reply" if c["is_reply"] else "top"
-            f.write(f"#{idx} [{kind}]\n")
-            f.write(f"comment_id: {c['comment_id']}\n")
-            if c["parent_id"]:
-                f.write(f"parent_id: {c['parent_id']}\n")
-            f.write(f"author: {c['author']}\n")
-            f.write(f"published_at: {c['published_at']}\n")
-            f.write(f"likes: {c['like_count']}\n\n")
-            f.write(c["text"])
-            f.write("\n" + "-" * 80 + "\n\n")
+    fname = f"YouTube_comments_for_video_{safe_label}_{today}{ext}"
+    return os.path.join(out_dir, fname)
+
+
+def dump_extension(compression: str | None = None) -> str:
+    """
+    ".txt", or ".txt" plus the codec's suffix for a compressed dump.
+    """
+    return ".txt" + (CODECS[compression] if compression else "")
+
+
+class CommentDumpWriter:
+    """
+    Streaming writer for the text dump format used by save_comments_to_file.
+    Each comment is encoded and written as soon as it is passed to write(),
+    so memory use does not depend on the number of comments.
+    When the total is not known up front, the header line is written with
+    a fixed-width placeholder and patched in place by close().
+    Output is UTF-8 with "\n" line endings.
+    With index=True, close() also writes the random-access sidecar
+    (comment_index.index_path(fpath)) from the record offsets seen.
+    compression ("gzip", "xz" or "zstd", see dump_codecs) streams the
+    dump through that compressor instead. A compressed dump can't be
+    patched, resumed or indexed, so pass total up front where it is known
+    (otherwise the header's total stays blank).
+    first_number: number of the first record ("#N"), for shards that
+    continue the numbering of the previous one.
+    """
+
+    TOTAL_LABEL = "Total comments (including replies): "
+    TOTAL_WIDTH = 20  # room for the patched-in count
+
+    def __init__(self, fpath: str, video_id: str, label: str, total: int | None = None,
+                 resume_from: dict | None = None, index: bool = True,
+                 compression: str | None = None, level: int | None = None,
+                 buffer_size: int | None = None, first_number: int = 1):
+        """
+        resume_from:
+            - None -> start a new file (overwriting any existing one).
+            - else -> a state() dict from an earlier writer on the same file;
+                      the file is truncated to that state and appended to
+                      (the sidecar index is then rebuilt from the file).
+        level / buffer_size: compression level and bytes buffered ahead of
+        the compressor (None -> dump_codecs defaults).
+        """
+        if compression and resume_from is not None:
+            raise ValueError("Compressed dumps can't be resumed.")
+        self.fpath = fpath
+        self._total = total
+        self._number_base = first_number - 1
+        self.bytes_written = 0     # uncompressed bytes, header included
+        self._compressed = bool(compression)
+        index = index and not compression
+        self._with_index = index
+        self._index = None
+        if index and os.path.exists(index_path(fpath)):
+            os.remove(index_path(fpath))
+        if resume_from is not None:
+            self.count = resume_from["count"]
+            self._total_offset = resume_from["total_offset"]
+            self._f = open(fpath, "r+b")
+            self._f.truncate(resume_from["offset"])
+            self._f.seek(resume_from["offset"])
+            self.bytes_written = resume_from["offset"]
+            return
+
+        self.count = 0
+        if index:
+            self._index = IndexBuilder()
+        if compression:
+            self._f = open_compressed_writer(fpath, compression, level, buffer_size)
+        else:
+            self._f = open(fpath, "wb")
+        self._write(f"Video ID: {video_id}\n")
+        self._write(f"Original input: {label}\n")
+        self._total_offset = None if compression else (
+            self._f.tell() + len(self.TOTAL_LABEL.encode("utf-8")))
+        if total is None:
+            self._write(f"{self.TOTAL_LABEL}{'':<{self.TOTAL_WIDTH}}\n")
+        else:
+            self._write(f"{self.TOTAL_LABEL}{total}\n")
+        self._write("=" * 80 + "\n\n")
+
+    def _write(self, s: str):
+        b = s.encode("utf-8")
+        self._f.write(b)
+        self.bytes_written += len(b)
+
+    def write(self, c: dict):
+        self.count += 1
+        kind = "reply" if c["is_reply"] else "top"
+        parts = [
+            f"#{self._number_base + self.count} [{kind}]\n",
+            f"comment_id: {c['comment_id']}\n",
+        ]
+        if c["parent_id"]:
+            parts.append(f"parent_id: {c['parent_id']}\n")
+        parts.append(f"author: {c['author']}\n")
+        parts.append(f"published_at: {c['published_at']}\n")
+        parts.append(f"updated_at: {c['updated_at']}\n")
+        parts.append(f"likes: {c['like_count']}\n\n")
+        parts.append(c["text"])
+        parts.append("\n" + "-" * 80 + "\n\n")
+        if self._index is not None:
+            self._index.add(self._f.tell(), c["comment_id"])
+        self._write("".join(parts))
+
+    def write_many(self, comments):
+        for c in comments:
+            self.write(c)
+
+    def state(self) -> dict:
+        """
+        Position after the last complete comment, for resume_from.
+        """
+        if self._compressed:
+            raise ValueError("Compressed dumps can't be resumed.")
+        return {
+            "count": self.count,
+            "offset": self._f.tell(),
+            "total_offset": self._total_offset,
+        }
+
+    def flush(self):
+        self._f.flush()
+
+    def abort(self):
+        """
+        Close the file without patching the header, leaving it resumable.
+        """
+        self._f.close()
+
+    def close(self) -> int:
+        """
+        Patch the total into the header (if it was not given up front),
+        close the file and return the number of comments written.
+        """
+        if self._f.closed:
+            return self.count
+        if self._compressed:
+            self._f.close()
+            return self.count
+        end = self._f.tell()
+        if self._total is None:
+            self._f.seek(self._total_offset)
+            self._f.write(f"{self.count:<{self.TOTAL_WIDTH}}".encode("utf-8"))
+        self._f.close()
+        if self._index is not None:
+            self._index.save(self.fpath, end)
+        elif self._with_index:
+            write_dump_index(self.fpath)
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+MANIFEST_VERSION = 1
+SHARD_RE = re.compile(r"\.part(\d{4,})$")
+
+
+def shard_root(fpath: str, compression: str | None = None) -> str:
+    """
+    fpath (a dump path) without its dump extension; shards are named
+    <root>.partNNNN<ext> and the manifest <root>.manifest.json.
+    """
+    ext = dump_extension(compression)
+    return fpath[:-len(ext)] if fpath.endswith(ext) else fpath
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ShardedDumpWriter:
+    """
+    CommentDumpWriter that rotates into size-bounded shards:
+        <root>.part0001.txt, <root>.part0002.txt, ...   (root: dump path
+                                                         without .txt)
+    Each shard is a complete dump (header, records, .idx sidecar unless
+    compressed) readable by every reader in this file; record numbers
+    continue across shards. A new shard is started before a top-level
+    comment once the current one holds shard_bytes (uncompressed), so
+    threads are never split and a shard exceeds the limit by at most
+    one thread.
+    <root>.manifest.json lists, per shard: file name, first/last record
+    number, count, byte size on disk, sha256 and index file. It is
+    rewritten (atomically) after every shard, with "complete": false
+    until close(). .fpath is the manifest path.
+    """
+
+    def __init__(self, fpath: str, video_id: str, label: str, shard_bytes: int,
+                 compression: str | None = None, level: int | None = None,
+                 buffer_size: int | None = None):
+        self.video_id = video_id
+        self.label = label
+        self.shard_bytes = max(1, shard_bytes)
+        self.compression = compression
+        self.level = level
+        self.buffer_size = buffer_size
+        self._root = shard_root(fpath, compression)
+        self.fpath = self._root + ".manifest.json"
+        self.count = 0
+        self.shards = []
+        self._writer = None
+        # Shards of an earlier run under the same name would mix with ours
+        ours = re.compile(re.escape(self._root) + r"\.part\d{4,}"
+                          + re.escape(dump_extension(compression)) + r"(\.idx)?")
+        for old in glob.glob(glob.escape(self._root) + ".part*"):
+            if ours.fullmatch(old):
+                os.remove(old)
+
+    def shard_path(self, n: int) -> str:
+        return f"{self._root}.part{n:04d}{dump_extension(self.compression)}"
+
+    def write(self, c: dict):
+        if self._writer is None or (not c["is_reply"]
+                                    and self._writer.bytes_written >= self.shard_bytes):
+            self._rotate()
+        self._writer.write(c)
+        self.count += 1
+
+    def write_many(self, comments):
+        for c in comments:
+            self.write(c)
+
+    def _rotate(self):
+        self._close_shard()
+        self._writer = CommentDumpWriter(
+            self.shard_path(len(self.shards) + 1), self.video_id, self.label,
+            compression=self.compression, level=self.level, buffer_size=self.buffer_size,
+            first_number=self.count + 1,
+        )
+
+    def _close_shard(self):
+        if self._writer is None:
+            return
+        writer, self._writer = self._writer, None
+        n = writer.close()
+        path = writer.fpath
+        self.shards.append({
+            "path": os.path.basename(path),
+            "first": self.count - n + 1,
+            "last": self.count,
+            "count": n,
+            "bytes": os.path.getsize(path),
+            "sha256": file_sha256(path),
+            "index": os.path.basename(index_path(path)) if os.path.exists(index_path(path)) else None,
+        })
+        self._save_manifest(complete=False)
+
+    def _save_manifest(self, complete: bool):
+        manifest = {
+            "manifest": MANIFEST_VERSION,
+            "video_id": self.video_id,
+            "label": self.label,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "compression": self.compression,
+            "shard_bytes": self.shard_bytes,
+            "complete": complete,
+            "total": self.count,
+            "shards": self.shards,
+        }
+        tmp = self.fpath + ".tmp"
+        with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+            json.dump(manifest, f, indent=2)
+            f.write("\n")
+        os.replace(tmp, self.fpath)
+
+    def flush(self):
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self) -> int:
+        """
+        Close the last shard, write the final manifest and return the
+        number of comments written.
+        """
+        if self._writer is None and self.shards:
+            return self.count
+        if self._writer is None:
+            # No comments: still leave one (empty) shard behind
+            self._rotate()
+        self._close_shard()
+        self._save_manifest(complete=True)
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # Keep what was written, but leave the manifest incomplete
+            self._close_shard()
+
+
+def read_shard_manifest(manifest_path: str, verify: bool = False) -> dict:
+    """
+    Load a ShardedDumpWriter manifest; shard paths are made absolute.
+    verify: check every shard's size and sha256 (ValueError on mismatch).
+    """
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    for shard in manifest["shards"]:
+        shard["path"] = os.path.join(base, shard["path"])
+        if verify and (os.path.getsize(shard["path"]) != shard["bytes"]
+                       or file_sha256(shard["path"]) != shard["sha256"]):
+            raise ValueError(f"Shard {shard['path']} does not match {manifest_path}.")
+    return manifest
+
+
+def iter_comments_from_manifest(manifest_path: str, first: int = 1, last: int | None = None):
+    """
+    Yield the comments numbered first..last (default: all) of a sharded
+    dump, opening only the shards that hold them.
+    """
+    for shard in read_shard_manifest(manifest_path)["shards"]:
+        if shard["last"] < first or (last is not None and shard["first"] > last):
+            continue
+        for number, c in enumerate(iter_comments_from_file(shard["path"]), shard["first"]):
+            if last is not None and number > last:
+                break
+            if number >= first:
+                yield c
+
+
+def save_comments_to_file(comments, video_id: str, label: str, out_dir: str | None = None,
+                          compression: str | None = None, level: int | None = None,
+                          buffer_size: int | None = None, shard_mb: float | None = None) -> str:
+    """
+    Save all comments into a single UTF-8 text file.
+    comments may be a list or any iterable (e.g. iter_all_comments); an
+    iterable is streamed to disk and the total is patched in at the end.
+    out_dir:
+        - None  -> current working directory (os.getcwd()).
+        - else  -> that directory (created if missing).
+    File name format:
+        YouTube_comments_for_video_<safe(label)>_<YYYYMMDD>.txt
+    plus its random-access index, <file>.idx (see comment_index.DumpLookup).
+    compression:
+        - None                   -> plain text, as above.
+        - "gzip"/"xz"/"zstd"     -> compressed with that codec at `level`,
+                                    file name ending .txt.gz/.txt.xz/.txt.zst,
+                                    no index. The readers in this file
+                                    detect compression on their own.
+    shard_mb:
+        - None  -> one file, as above.
+        - else  -> rotate into shards of about shard_mb MB each
+                   (ShardedDumpWriter); the manifest path
+                   (<file without .txt>.manifest.json) is returned instead.
+    """
+    fpath = comments_file_path(label, out_dir, ext=dump_extension(compression))
+    if shard_mb:
+        with ShardedDumpWriter(fpath, video_id, label, int(shard_mb * 2 ** 20),
+                               compression=compression, level=level,
+                               buffer_size=buffer_size) as writer:
+            writer.write_many(comments)
+        return writer.fpath
+    total = len(comments) if hasattr(comments, "__len__") else None
+
+    with CommentDumpWriter(fpath, video_id, label, total=total, compression=compression,
+                           level=level, buffer_size=buffer_size) as writer:
+        writer.write_many(comments)
 
     return fpath
 
 
+RECORD_HEADER_RE = re.compile(r"#(\d+) \[(top|reply)\]")
+RECORD_SEPARATOR = "-" * 80
+
+
+def read_dump_header(fpath: str) -> dict:
+    """
+    Read the header block of a dump written by save_comments_to_file.
+    Returns {"video_id", "label", "total"} (total is None if missing).
+    """
+    header = {"video_id": None, "label": None, "total": None}
+    with open_dump_text(fpath) as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.startswith("=" * 80):
+                break
+            key, _, value = line.partition(": ")
+            if key == "Video ID":
+                header["video_id"] = value
+            elif key == "Original input":
+                header["label"] = value
+            elif key.startswith("Total comments"):
+                header["total"] = int(value) if value.strip() else None
+    return header
+
+
+def _parse_dump_record(lines: list) -> dict:
+    """
+    Turn the lines of one dump record (header line through the text,
+    without the trailing separator) back into a comment dict.
+    """
+    kind = RECORD_HEADER_RE.match(lines[0]).group(2)
+    fields = {}
+    i = 1
+    while lines[i]:
+        key, _, value = lines[i].partition(": ")
+        fields[key] = value
+        i += 1
+    return {
+        "comment_id": fields.get("comment_id", ""),
+        "parent_id": fields.get("parent_id"),
+        "is_reply": kind == "reply",
+        "author": fields.get("author", ""),
+        "published_at": fields.get("published_at", ""),
+        # Dumps written before updated_at was recorded don't have it
+        "updated_at": fields.get("updated_at", ""),
+        "like_count": int(fields.get("likes", 0) or 0),
+        "text": "\n".join(lines[i + 1:]),
+    }
+
+
+def iter_comments_from_file(fpath: str):
+    """
+    Yield the comment dicts stored in a dump written by
+    save_comments_to_file, in file order.
+    A record ends at a separator line followed by a blank line and the
+    next "#N [kind]" line (or the end of the file), so comment text that
+    happens to contain a separator line is read back intact.
+    """
+    with open_dump_text(fpath) as f:
+        for line in f:
+            if line.startswith("=" * 80):
+                break
+        buf = []
+        for line in f:
+            line = line.rstrip("\n")
+            if (RECORD_HEADER_RE.fullmatch(line) and len(buf) >= 3
+                    and buf[-2] == RECORD_SEPARATOR and buf[-1] == ""):
+                yield _parse_dump_record(buf[:-2])
+                buf = []
+            if buf or line:
+                buf.append(line)
+        if len(buf) >= 3 and buf[-2] == RECORD_SEPARATOR and buf[-1] == "":
+            yield _parse_dump_record(buf[:-2])
+
+
+def find_latest_dump(label: str, out_dir: str | None = None) -> str | None:
+    """
+    Return the most recent completed dump of `label` in out_dir (any
+    date, plain or compressed; shards of a sharded dump don't count),
+    or None if there is none.
+    """
+    if out_dir is None:
+        out_dir = os.getcwd()
+    found = []
+    for codec in (None, *CODECS):
+        pattern = os.path.join(
+            glob.escape(out_dir),
+            f"YouTube_comments_for_video_{safe_for_filename(label)}_*{dump_extension(codec)}",
+        )
+        found.extend(p for p in glob.glob(pattern)
+                     if not os.path.exists(checkpoint_path(p))
+                     and not SHARD_RE.search(shard_root(p, codec)))
+    return max(found, key=os.path.getmtime) if found else None
+
+
+def refresh_video_comments(video_id: str, label: str, previous_path: str,
+                           out_dir: str | None = None, text_format: str = TEXT_FORMAT,
+                           workers: int = REPLY_WORKERS):
+    """
+    Incrementally refresh an earlier dump of video_id instead of
+    re-crawling it. The newest top-level comment_id / published_at in
+    previous_path is used as a watermark: commentThreads pages are
+    requested newest first (ORDER = "time") and paging stops after the
+    page on which the first already-known thread appears.
+    Threads are requested with their embedded replies. New threads are
+    fetched in full; known threads on the last page are re-fetched only
+    when their updatedAt or reply count changed, or when one of their
+    embedded replies has a different updatedAt.
+    The result is a complete dump (new threads first, then the previous
+    dump with changed threads swapped in place) written to the usual
+    output path.
+    Returns (out_path, number of comments, number of new/changed threads).
+    """
+    if ORDER != "time":
+        raise ValueError('Incremental refresh needs ORDER = "time".')
+
+    known = {}           # comment_id -> updated_at
+    reply_counts = {}    # parent_id -> number of replies
+    watermark = ""       # newest top-level published_at
+    for c in iter_comments_from_file(previous_path):
+        known[c["comment_id"]] = c["updated_at"]
+        if c["is_reply"]:
+            reply_counts[c["parent_id"]] = reply_counts.get(c["parent_id"], 0) + 1
+        elif c["published_at"] > watermark:
+            watermark = c["published_at"]
+
+    fresh = []           # new threads, written ahead of the previous records
+    updated = {}         # known top-level id -> re-fetched thread
+    page_token = None
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        while True:
+            # Embedded replies carry updatedAt, so edits can be spotted
+            # without a comments.list call per known thread.
+            data = fetch_comment_threads_page(video_id, page_token, text_format=text_format,
+                                              inline_replies=True)
+            page = []
+            reached_known = False
+            for item in data.get("items", []):
+                snippet = item["snippet"]
+                top = snippet["topLevelComment"]
+                comment = comment_from_snippet(top["id"], None, top["snippet"])
+                top_id = comment["comment_id"]
+                if top_id not in known:
+                    if comment["published_at"] <= watermark:
+                        reached_known = True
+                        continue
+                    page.append((comment, submit_thread_replies(
+                        pool, item, text_format=text_format, inline_replies=True)))
+                    continue
+
+                reached_known = True
+                inline = (item.get("replies") or {}).get("comments", [])
+                changed = (known[top_id] != comment["updated_at"]
+                           or snippet.get("totalReplyCount", 0) != reply_counts.get(top_id, 0)
+                           or any(known.get(r["id"]) != r["snippet"].get("updatedAt", "")
+                                  for r in inline))
+                if changed:
+                    page.append((comment, submit_thread_replies(
+                        pool, item, text_format=text_format, inline_replies=True)))
+
+            for comment, replies in page:
+                if not isinstance(replies, list):
+                    replies = replies.result()
+                if comment["comment_id"] in known:
+                    updated[comment["comment_id"]] = [comment] + replies
+                else:
+                    fresh.append([comment] + replies)
+
+            page_token = data.get("nextPageToken")
+            if reached_known or not page_token:
+                break
+
+    out_path = comments_file_path(label, out_dir)
+    tmp_path = out_path + ".tmp"
+    with CommentDumpWriter(tmp_path, video_id, label) as writer:
+        for thread in fresh:
+            writer.write_many(thread)
+        for c in iter_comments_from_file(previous_path):
+            if c["comment_id"] in updated:
+                # Changed thread goes where the old one was
+                writer.write_many(updated[c["comment_id"]])
+            elif c["parent_id"] not in updated:
+                writer.write(c)
+    # The previous dump may be today's file, so only replace it at the end
+    os.replace(tmp_path, out_path)
+    os.replace(index_path(tmp_path), index_path(out_path))
+    return out_path, writer.count, len(fresh) + len(updated)
+
+
+def open_comment_writer(fmt: str, video_id: str | None, label: str,
+                        out_dir: str | None = None, db_path: str | None = None,
+                        compression: str | None = None, level: int | None = None,
+                        shard_mb: float | None = None):
+    """
+    A new writer for one dump in any of FORMATS. All of them have
+    write / write_many / close, a .count and the .fpath written to.
+        - "text"                    -> CommentDumpWriter (this file's format),
+                                       compressed if compression is given,
+                                       ShardedDumpWriter if shard_mb is
+        - "jsonl"/"parquet"/"arrow" -> comment_formats writers, same file
+                                       naming with the format's extension
+        - "sqlite"                  -> SQLiteCommentWriter on db_path (default:
+                                       comment_store.DEFAULT_DB_NAME in out_dir)
+    """
+    if fmt == "sqlite":
+        return SQLiteCommentWriter(db_path or default_db_path(out_dir), video_id)
+    if fmt == "text":
+        fpath = comments_file_path(label, out_dir, ext=dump_extension(compression))
+        if shard_mb:
+            return ShardedDumpWriter(fpath, video_id, label, int(shard_mb * 2 ** 20),
+                                     compression=compression, level=level)
+        return CommentDumpWriter(fpath, video_id, label, compression=compression, level=level)
+    fpath = comments_file_path(label, out_dir, ext=FORMATS[fmt])
+    return open_format_writer(fmt, fpath, video_id)
+
+
+def checkpoint_path(fpath: str) -> str:
+    """
+    Sidecar checkpoint path for the dump file fpath.
+    """
+    return fpath + ".checkpoint.json"
+
+
+def save_checkpoint(path: str, state: dict):
+    """
+    Atomically replace the checkpoint at path with state.
+    """
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def find_checkpoint(label: str, out_dir: str | None = None) -> str | None:
+    """
+    Return the most recent checkpoint for a dump of `label` in out_dir
+    (any date), or None if there is none.
+    """
+    if out_dir is None:
+        out_dir = os.getcwd()
+    pattern = os.path.join(
+        glob.escape(out_dir),
+        f"YouTube_comments_for_video_{safe_for_filename(label)}_*.txt.checkpoint.json",
+    )
+    found = glob.glob(pattern)
+    return max(found, key=os.path.getmtime) if found else None
+
+
+def dump_video_comments(video_id: str, label: str, out_dir: str | None = None,
+                        text_format: str = TEXT_FORMAT, workers: int = REPLY_WORKERS,
+                        inline_replies: bool = False, resume: bool = False,
+                        stop_event: threading.Event | None = None,
+                        fmt: str = "text", db_path: str | None = None,
+                        compression: str | None = None, level: int | None = None,
+                        pipeline: bool = False, shard_mb: float | None = None):
+    """
+    Stream all comments of video_id into a dump file, keeping a sidecar
+    checkpoint (<dump>.checkpoint.json) with the commentThreads page token
+    in progress, the threads of that page already written and the output
+    byte offset. If the run stops for any reason (quota, HTTP error,
+    Ctrl-C) the checkpoint is left behind; with resume=True the dump is
+    truncated to the checkpointed offset and paging restarts from the
+    checkpointed page, skipping the finished threads.
+    The checkpoint is removed once the dump completes.
+    stop_event: when set (from another thread), the dump stops after the
+    current thread as if interrupted with Ctrl-C.
+    fmt:
+        - "text" -> the dump file described above.
+        - else   -> any other of FORMATS via open_comment_writer (sqlite
+                    upserts into db_path). These are streamed without a
+                    checkpoint: a columnar file can't be appended to after
+                    a crash, and re-running a SQLite dump only merges.
+    compression / level: compress the text dump (see CommentDumpWriter);
+    compressed dumps are streamed without a checkpoint too.
+    shard_mb: rotate the text dump into shards (see ShardedDumpWriter;
+    out_path is then the manifest), also streamed without a checkpoint.
+    pipeline: fetch with iter_comment_threads_pipelined, so fetching,
+    normalizing and writing overlap; per-stage throughput is printed at
+    the end.
+    Returns (out_path, number of comments).
+    """
+    stages = [] if pipeline else None
+
+    def threads_from(page_token=None, skip_parents=()):
+        if pipeline:
+            return iter_comment_threads_pipelined(
+                video_id, text_format=text_format, workers=workers,
+                inline_replies=inline_replies, page_token=page_token,
+                skip_parents=skip_parents, stages=stages,
+            )
+        return iter_comment_threads(
+            video_id, text_format=text_format, workers=workers,
+            inline_replies=inline_replies, page_token=page_token,
+            skip_parents=skip_parents,
+        )
+
+    def print_stages():
+        for stats in stages or ():
+            print(f"[{video_id}] {stats.summary_line()}")
+
+    if fmt != "text" or compression or shard_mb:
+        if resume:
+            raise ValueError("resume only applies to the uncompressed, unsharded text format.")
+        with open_comment_writer(fmt, video_id, label, out_dir, db_path,
+                                 compression=compression, level=level,
+                                 shard_mb=shard_mb) as writer:
+            for _, thread in threads_from():
+                with SCHEDULER.metrics.timed("disk_write"):
+                    writer.write_many(thread)
+                if stop_event is not None and stop_event.is_set():
+                    raise KeyboardInterrupt
+        print_stages()
+        return writer.fpath, writer.count
+
+    ckpt = find_checkpoint(label, out_dir) if resume else None
+    if ckpt:
+        with open(ckpt, encoding="utf-8") as f:
+            state = json.load(f)
+        if state["video_id"] != video_id:
+            raise ValueError(f"Checkpoint {ckpt} is for video {state['video_id']!r}, not {video_id!r}.")
+        out_path = state["out_path"]
+        print(f"Resuming {out_path} after {state['writer']['count']} comments ...")
+        writer = CommentDumpWriter(out_path, video_id, label, resume_from=state["writer"])
+    else:
+        if resume:
+            print("No checkpoint found, starting a new dump.")
+        # Absolute, so --resume works from any working directory
+        out_path = os.path.abspath(comments_file_path(label, out_dir))
+        ckpt = checkpoint_path(out_path)
+        state = {"video_id": video_id, "out_path": out_path,
+                 "page_token": None, "done_parents": []}
+        writer = CommentDumpWriter(out_path, video_id, label)
+        state["writer"] = writer.state()
+
+    threads = threads_from(state["page_token"], frozenset(state["done_parents"]))
+    try:
+        for page_token, thread in threads:
+            if page_token != state["page_token"]:
+                # Previous page is complete
+                with SCHEDULER.metrics.timed("checkpoint"):
+                    writer.flush()
+                    save_checkpoint(ckpt, state)
+                state["page_token"] = page_token
+                state["done_parents"] = []
+            with SCHEDULER.metrics.timed("disk_write"):
+                writer.write_many(thread)
+            state["done_parents"].append(thread[0]["comment_id"])
+            state["writer"] = writer.state()
+            if stop_event is not None and stop_event.is_set():
+                raise KeyboardInterrupt
+    except BaseException:
+        writer.abort()
+        save_checkpoint(ckpt, state)
+        print(f"Interrupted; progress saved to {ckpt} (re-run with --resume).")
+        raise
+
+    count = writer.close()
+    if os.path.exists(ckpt):
+        os.remove(ckpt)
+    print_stages()
+    return out_path, count
+
+
+def iter_channel_threads(channel_id: str, text_format: str = TEXT_FORMAT,
+                         workers: int = REPLY_WORKERS, inline_replies: bool = False):
+    """
+    Yield (video_id, thread) for every comment thread related to
+    channel_id, paging commentThreads with allThreadsRelatedToChannelId in
+    a single stream instead of once per video. Replies are fetched as in
+    iter_comment_threads.
+    """
+    page_token = None
+    pool = ThreadPoolExecutor(max_workers=max(1, workers))
+    try:
+        while True:
+            data = fetch_comment_threads_page(None, page_token, text_format=text_format,
+                                              inline_replies=inline_replies,
+                                              channel_id=channel_id)
+            page = []
+            for item in data.get("items", []):
+                top = item["snippet"]["topLevelComment"]
+                comment = comment_from_snippet(top["id"], None, top["snippet"])
+                replies = submit_thread_replies(pool, item, text_format=text_format,
+                                                inline_replies=inline_replies)
+                page.append((item["snippet"].get("videoId", ""), comment, replies))
+
+            for video_id, comment, replies in page:
+                if not isinstance(replies, list):
+                    replies = replies.result()
+                yield video_id, [comment] + replies
+
+            page_token = data.get("nextPageToken")
+            if not page_token:
+                break
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def dump_channel_comments(channel_id: str, out_dir: str | None = None,
+                          text_format: str = TEXT_FORMAT, workers: int = REPLY_WORKERS,
+                          inline_replies: bool = False, fmt: str = "text",
+                          db_path: str | None = None) -> dict:
+    """
+    Dump every comment thread related to channel_id, fanned out into one
+    dump file per video (same format and file naming as a single-video
+    dump, labelled with the video ID).
+    At most MAX_OPEN_DUMPS files are open at once; the least recently
+    used one is closed and later reopened in append mode.
+    The other formats, which all have a video_id column, write every
+    thread into a single output instead (one database for sqlite, one
+    file labelled with the channel ID otherwise).
+    If the run stops (quota, HTTP error, Ctrl-C), the text dumps are left
+    unfinished: header total unpatched, no index, and a checkpoint that
+    restarts the video from its first page, so find_latest_dump skips
+    them and a single-video dump with resume=True re-fetches them.
+    Returns {video_id: (out_path, number of comments)}.
+    """
+    threads = iter_channel_threads(channel_id, text_format=text_format, workers=workers,
+                                   inline_replies=inline_replies)
+    if fmt != "text":
+        counts = {}
+        with open_comment_writer(fmt, None, channel_id, out_dir, db_path) as writer:
+            for video_id, thread in threads:
+                with SCHEDULER.metrics.timed("disk_write"):
+                    writer.write_many(dict(c, video_id=video_id) for c in thread)
+                counts[video_id] = counts.get(video_id, 0) + len(thread)
+        return {video_id: (writer.fpath, n) for video_id, n in counts.items()}
+
+    open_writers = {}    # video_id -> CommentDumpWriter, oldest use first
+    parked = {}          # video_id -> state() of a closed, unfinished writer
+    started = {}         # video_id -> state() of its dump before any comment
+    paths = {}
+
+    def writer_for(video_id):
+        writer = open_writers.pop(video_id, None)
+        if writer is None:
+            if len(open_writers) >= MAX_OPEN_DUMPS:
+                oldest = next(iter(open_writers))
+                parked[oldest] = open_writers[oldest].state()
+                open_writers.pop(oldest).abort()
+            if video_id in parked:
+                writer = CommentDumpWriter(paths[video_id], video_id, video_id,
+                                           resume_from=parked.pop(video_id))
+            else:
+                paths[video_id] = os.path.abspath(comments_file_path(video_id, out_dir))
+                writer = CommentDumpWriter(paths[video_id], video_id, video_id)
+                started[video_id] = writer.state()
+        open_writers[video_id] = writer
+        return writer
+
+    counts = {}
+    try:
+        for video_id, thread in threads:
+            with SCHEDULER.metrics.timed("disk_write"):
+                writer_for(video_id).write_many(thread)
+    except BaseException:
+        # Any video may be missing threads, so none of the dumps is complete
+        for writer in open_writers.values():
+            writer.abort()
+        for video_id, path in paths.items():
+            save_checkpoint(checkpoint_path(path), {
+                "video_id": video_id, "out_path": path, "page_token": None,
+                "done_parents": [], "writer": started[video_id],
+            })
+        print(f"Interrupted; {len(paths)} unfinished video dumps left with checkpoints "
+              "(re-run a video with --resume to fetch it completely).")
+        raise
+
+    for video_id, writer in open_writers.items():
+        counts[video_id] = writer.close()
+    for video_id, state in parked.items():
+        counts[video_id] = CommentDumpWriter(paths[video_id], video_id, video_id,
+                                             resume_from=state).close()
+
+    return {video_id: (paths[video_id], counts[video_id]) for video_id in paths}
+
+
+def read_batch_inputs(path: str) -> list:
+    """
+    Read video URLs/IDs from a file (or stdin for "-"), one per line.
+    Blank lines and lines starting with "#" are ignored.
+    """
+    if path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.lstrip().startswith("#")]
+
+
+def dump_batch(inputs, out_dir: str | None = None, parallel: int = BATCH_PARALLEL,
+               text_format: str = TEXT_FORMAT, workers: int = REPLY_WORKERS,
+               inline_replies: bool = False, resume: bool = False,
+               fmt: str = "text", db_path: str | None = None,
+               compression: str | None = None, level: int | None = None,
+               pipeline: bool = False, shard_mb: float | None = None):
+    """
+    Dump many videos, up to `parallel` at once. All of them share
+    SCHEDULER, so the rate limit, in-flight cap and quota budget are
+    global to the batch (fmt / db_path / compression / level / pipeline /
+    shard_mb as in dump_video_comments).
+    Inputs are resolved with extract_video_id and
+    de-duplicated by video ID.
+    A failing video is recorded and the batch moves on (its checkpoint
+    is kept, so a later run with resume=True continues it). Once the
+    quota budget or the API's daily quota is exhausted the videos not
+    yet started are skipped.
+    Returns one result dict per input: input, video_id, status
+    ("ok" / "failed" / "skipped"), out_path, count, error.
+    """
+    results = []
+    jobs = {}
+    for label in inputs:
+        try:
+            video_id = extract_video_id(label)
+        except ValueError as e:
+            results.append({"input": label, "video_id": None, "status": "failed",
+                            "out_path": None, "count": 0, "error": str(e)})
+            continue
+        if video_id not in jobs:
+            jobs[video_id] = label
+
+    stop = threading.Event()
+    out_of_quota = threading.Event()
+
+    def run(video_id, label):
+        result = {"input": label, "video_id": video_id, "status": "skipped",
+                  "out_path": None, "count": 0, "error": None}
+        if stop.is_set() or out_of_quota.is_set():
+            return result
+        try:
+            result["out_path"], result["count"] = dump_video_comments(
+                video_id, label=label, out_dir=out_dir, text_format=text_format,
+                workers=workers, inline_replies=inline_replies, resume=resume,
+                stop_event=stop, fmt=fmt, db_path=db_path,
+                compression=compression, level=level, pipeline=pipeline,
+                shard_mb=shard_mb,
+            )
+            result["status"] = "ok"
+            print(f"[{video_id}] {result['count']} comments -> {result['out_path']}")
+        except QUOTA_ERRORS as e:
+            out_of_quota.set()
+            result.update(status="failed", error=str(e))
+        except Exception as e:
+            # Not str(e): an HTTPError's message holds the URL with the API key
+            result.update(status="failed", error=describe_error(e))
+            print(f"[{video_id}] failed: {result['error']}")
+        except KeyboardInterrupt:
+            result.update(status="failed", error="interrupted")
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, parallel)) as pool:
+        futures = [pool.submit(run, vid, label) for vid, label in jobs.items()]
+        try:
+            for fut in as_completed(futures):
+                results.append(fut.result())
+        except KeyboardInterrupt:
+            # Let running dumps checkpoint and stop; queued ones are skipped
+            stop.set()
+            raise
+    return results
+
+
+def estimate_batch_quota(inputs, inline_replies: bool = False) -> tuple:
+    """
+    Dry-run estimate for dump_batch: estimate_dump_quota summed over the
+    distinct video IDs of inputs. Returns ({endpoint: calls},
+    {input: error} for inputs without a video ID or whose estimate
+    failed, e.g. a deleted or private video). Once the quota is exhausted
+    the remaining videos are not estimated.
+    """
+    calls, errors = {}, {}
+    video_ids = {}
+    for label in inputs:
+        try:
+            video_ids.setdefault(extract_video_id(label), label)
+        except ValueError as e:
+            errors[label] = str(e)
+    out_of_quota = None
+    for video_id, label in video_ids.items():
+        if out_of_quota:
+            errors[label] = f"not estimated ({out_of_quota})"
+            continue
+        try:
+            estimate = estimate_dump_quota(video_id, inline_replies=inline_replies)
+        except QUOTA_ERRORS as e:
+            out_of_quota = errors[label] = str(e)
+            continue
+        except Exception as e:
+            errors[label] = describe_error(e)
+            continue
+        for ep, n in estimate.items():
+            calls[ep] = calls.get(ep, 0) + n
+    return calls, errors
+
+
 def parse_args():
     parser = argparse.ArgumentParser(
         description="Dump all YouTube comments for a video into a text file."
     )
     parser.add_argument(
         "video",
+        nargs="?",
         help="YouTube video URL or 11-character video ID"
     )
+    parser.add_argument(
+        "--batch",
+        default=None,
+        metavar="FILE",
+        help='File with one video URL/ID per line ("-" for stdin) to dump in parallel',
+    )
+    parser.add_argument(
+        "--channel",
+        default=None,
+        metavar="CHANNEL_ID",
+        help="Dump all comment threads related to a channel (UC... ID), "
+             "one output file per video",
+    )
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=BATCH_PARALLEL,
+        help=f"Videos crawled at once with --batch (default: {BATCH_PARALLEL})",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=None,
+        help="Cap on API requests open at once across all videos and workers",
+    )
     parser.add_argument(
         "--out-dir",
         default=None,
         help="Directory to save the .txt file (default: current working directory)",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--format",
+        choices=tuple(FORMATS),
+        default="text",
+        help="Output format (default: text). jsonl/parquet/arrow write typed "
+             "columns (parquet/arrow need pyarrow); sqlite upserts into --db",
+    )
+    parser.add_argument(
+        "--compress",
+        choices=tuple(CODECS),
+        default=COMPRESSION,
+        help="Compress the text dump (zstd needs the zstandard package); "
+             "readers detect compression automatically",
+    )
+    parser.add_argument(
+        "--shard-mb",
+        type=float,
+        default=SHARD_MB,
+        help="Rotate the text dump into shards of about this many MB, with a "
+             "<dump>.manifest.json listing each shard's record range, size and sha256",
+    )
+    parser.add_argument(
+        "--compress-level",
+        type=int,
+        default=None,
+        help="Compression level (default: gzip 6, xz 6, zstd 3)",
+    )
+    parser.add_argument(
+        "--buffer-size",
+        type=int,
+        default=None,
+        help=f"Bytes buffered ahead of the compressor (default: {dump_codecs.BUFFER_SIZE})",
+    )
+    parser.add_argument(
+        "--db",
+        default=None,
+        help="SQLite database for --format sqlite (default: youtube_comments.sqlite3 in --out-dir)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=REPLY_WORKERS,
+        help=f"Concurrent reply fetches per page (default: {REPLY_WORKERS}; 1 = serial)",
+    )
+    parser.add_argument(
+        "--inline-replies",
+        action="store_true",
+        help="Request part=snippet,replies and only call comments.list for "
+             "threads with more replies than were embedded",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Fetch, normalize and write in separate threads connected by bounded queues "
+             f"({PIPELINE_QUEUE} threads each) and print per-stage throughput",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted dump from its .checkpoint.json sidecar",
+    )
+    parser.add_argument(
+        "--rate",
+        type=positive_rate,
+        default=None,
+        help="Maximum API requests per second (default: 10)",
+    )
+    parser.add_argument(
+        "--quota-budget",
+        type=int,
+        default=None,
+        help="Stop before using more than this many quota units",
+    )
+    parser.add_argument(
+        "--estimate",
+        action="store_true",
+        help="Only print an estimate of the quota units a full dump (or --batch) would use",
+    )
+    parser.add_argument(
+        "--measure-savings",
+        action="store_true",
+        help="Re-request one page per endpoint without fields= to report the "
+             "payload bytes saved by the projections (costs a few extra units)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Refresh the latest earlier dump of this video instead of re-crawling it",
+    )
+    parser.add_argument(
+        "--delta",
+        action="store_true",
+        help="Write only the comments inserted, updated or deleted since the latest "
+             "dump (plus its earlier deltas) to a delta file; fold deltas into a new "
+             "dump with: python comment_delta.py compact DUMP",
+    )
+    parser.add_argument(
+        "--previous",
+        default=None,
+        help="Earlier dump to refresh with --incremental or to diff against with "
+             "--delta (default: newest dump of this video in --out-dir)",
+    )
+    parser.add_argument(
+        "--metrics-json",
+        default=None,
+        metavar="FILE",
+        help="Write a JSON summary of per-endpoint request timings, sizes, "
+             "statuses and retries at the end of the run",
+    )
+    parser.add_argument(
+        "--metrics-prom",
+        default=None,
+        metavar="FILE",
+        help="Write the same metrics in Prometheus text format (with latency histograms)",
+    )
+    args = parser.parse_args()
+    if sum(x is not None for x in (args.video, args.batch, args.channel)) != 1:
+        parser.error("give exactly one of a video, --batch FILE or --channel CHANNEL_ID")
+    if args.channel and (args.estimate or args.resume or args.incremental):
+        parser.error("--estimate, --resume and --incremental don't apply to --channel")
+    if args.batch and args.incremental:
+        parser.error("--incremental applies to single-video dumps")
+    if args.format != "text" and (args.resume or args.incremental):
+        parser.error("--resume and --incremental only apply to --format text")
+    if args.delta and (args.format != "text" or args.resume or args.incremental
+                       or args.compress or args.batch or args.channel):
+        parser.error("--delta applies to single-video text dumps and can't be combined "
+                     "with --resume, --incremental or --compress")
+    if args.pipeline and (args.channel or args.incremental):
+        parser.error("--pipeline applies to single-video and --batch dumps")
+    if args.shard_mb and (args.format != "text" or args.resume or args.incremental
+                          or args.delta or args.channel):
+        parser.error("--shard-mb only applies to --format text, without --resume, "
+                     "--incremental, --delta or --channel")
+    if args.compress and (args.format != "text" or args.resume or args.incremental or args.channel):
+        parser.error("--compress only applies to --format text, without --resume, "
+                     "--incremental or --channel")
+    return args
 
 
-def main():
-    if not API_KEY:
-        raise RuntimeError("Missing YOUTUBE_API_KEY environment variable.")
+def print_run_summary():
+    print(SCHEDULER.ledger.summary())
+    print(SCHEDULER.payload.summary())
+    print(SCHEDULER.metrics.summary_line())
+
+
+def run(args, parallel: int):
+    if args.channel:
+        print(f"Fetching all comment threads for channel: {args.channel} ...")
+        dumps = dump_channel_comments(
+            args.channel,
+            out_dir=args.out_dir,
+            workers=args.workers,
+            inline_replies=args.inline_replies,
+            fmt=args.format,
+            db_path=args.db,
+        )
+        for video_id, (out_path, count) in dumps.items():
+            print(f"[{video_id}] {count} comments -> {out_path}")
+        print(f"{len(dumps)} videos, {sum(c for _, c in dumps.values())} comments (including replies).")
+        print_run_summary()
+        return
+
+    if args.batch:
+        inputs = read_batch_inputs(args.batch)
+        if args.estimate:
+            calls, errors = estimate_batch_quota(inputs, inline_replies=args.inline_replies)
+            print(f"Estimated quota for a full dump of the batch ({len(inputs)} inputs):")
+            print(format_estimate(calls))
+            for label, error in errors.items():
+                print(f"  skipped: {label} ({error})")
+            return
+        print(f"Dumping {len(inputs)} videos, {parallel} at a time ...")
+        results = dump_batch(
+            inputs,
+            out_dir=args.out_dir,
+            parallel=parallel,
+            workers=args.workers,
+            inline_replies=args.inline_replies,
+            resume=args.resume,
+            fmt=args.format,
+            db_path=args.db,
+            compression=args.compress,
+            level=args.compress_level,
+            pipeline=args.pipeline,
+            shard_mb=args.shard_mb,
+        )
+        for status in ("ok", "failed", "skipped"):
+            n = sum(r["status"] == status for r in results)
+            print(f"{status}: {n}")
+        for r in results:
+            if r["status"] != "ok":
+                print(f"  {r['status']}: {r['input']} ({r['error'] or 'not started'})")
+        print_run_summary()
+        return
 
-    args = parse_args()
     video_input = args.video
     video_id = extract_video_id(video_input)
 
-    print(f"Fetching comments for video: {video_id} ...")
-    comments = fetch_all_comments(video_id)
-    print(f"Fetched {len(comments)} comments (including replies).")
+    if args.estimate:
+        calls = estimate_dump_quota(video_id, inline_replies=args.inline_replies)
+        print(f"Estimated quota for a full dump of {video_id}:")
+        print(format_estimate(calls))
+        return
+
+    if args.delta:
+        base = args.previous or find_latest_dump(video_input, args.out_dir)
+        if base:
+            # comment_delta builds on this module. Run as a script, this
+            # module is __main__ and comment_delta imports a second copy
+            # with its own unconfigured SCHEDULER, so fetch from here
+            from comment_delta import write_delta
+            print(f"Diffing video {video_id} against {base} ...")
+            fetch = iter_comment_threads_pipelined if args.pipeline else iter_comment_threads
+            threads = (thread for _, thread in fetch(
+                video_id, workers=args.workers, inline_replies=args.inline_replies))
+            delta_path, counts = write_delta(base, threads, video_id=video_id)
+            print(f"{counts['insert']} inserted, {counts['update']} updated, "
+                  f"{counts['delete']} deleted comments.")
+            print("Saved to:", delta_path or "nothing (no changes)")
+            print_run_summary()
+            return
+        print("No earlier dump found, doing a full dump.")
+
+    if args.incremental:
+        previous = args.previous or find_latest_dump(video_input, args.out_dir)
+        if previous:
+            print(f"Refreshing {previous} for video: {video_id} ...")
+            out_path, count, changed = refresh_video_comments(
+                video_id,
+                label=video_input,
+                previous_path=previous,
+                out_dir=args.out_dir,
+                workers=args.workers,
+            )
+            print(f"{changed} new or changed threads; {count} comments (including replies).")
+            print("Saved to:", out_path)
+            print_run_summary()
+            return
+        print("No earlier dump found, doing a full dump.")
 
-    out_path = save_comments_to_file(
-        comments=comments,
-        video_id=video_id,
+    print(f"Fetching comments for video: {video_id} ...")
+    out_path, count = dump_video_comments(
+        video_id,
         label=video_input,
         out_dir=args.out_dir,
+        workers=args.workers,
+        inline_replies=args.inline_replies,
+        resume=args.resume,
+        fmt=args.format,
+        db_path=args.db,
+        compression=args.compress,
+        level=args.compress_level,
+        pipeline=args.pipeline,
+        shard_mb=args.shard_mb,
     )
+    print(f"Fetched {count} comments (including replies).")
     print("Saved to:", out_path)
+    print_run_summary()
+
+
+def main():
+    if not API_KEY:
+        raise RuntimeError("Missing YOUTUBE_API_KEY environment variable.")
+
+    args = parse_args()
+    SCHEDULER.configure(rate=args.rate, budget=args.quota_budget,
+                        measure_savings=args.measure_savings,
+                        max_in_flight=args.max_in_flight)
+    # One pooled connection per reply worker plus the page fetcher, per video
+    parallel = args.parallel if args.batch else 1
+    pool_size = parallel * (args.workers + 1)
+    if args.max_in_flight:
+        pool_size = min(pool_size, args.max_in_flight)
+    api_client.configure(pool_size=pool_size)
+    dump_codecs.configure(buffer_size=args.buffer_size)
+
+    try:
+        run(args, parallel)
+    finally:
+        SCHEDULER.metrics.write(args.metrics_json, args.metrics_prom)
 
 
 if __name__ == "__main__":